@@ -0,0 +1,86 @@
+"""Benchmark del armado de la tabla ancha de precios (scrape_all_async_v2.construir_tabla_precios).
+
+Compara contra la implementación anterior (búsqueda lineal por producto y supermercado)
+sobre listas sintéticas y verifica que el CSV resultante sea idéntico.
+
+    python benchmarks/bench_merge.py --productos 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrape_all_async_v2 import SUPERMERCADOS, construir_tabla_precios
+
+
+def obtener_precio(lista_productos_supermercado, nombre_producto_buscado):
+    """Implementación anterior: búsqueda lineal, primer match"""
+    for producto in lista_productos_supermercado:
+        if producto["nombre"] == nombre_producto_buscado:
+            return producto["precio"]
+    return np.nan
+
+
+def tabla_lineal(fecha, datos_por_tienda):
+    datos = [datos_por_tienda.get(t, []) for t in SUPERMERCADOS]
+    nombres_unicos = sorted(set(p['nombre'] for r in datos for p in r))
+    filas = []
+    for nombre_producto in nombres_unicos:
+        fila = {"fecha": fecha, "producto": nombre_producto}
+        for tienda, lista in zip(SUPERMERCADOS, datos):
+            fila[tienda] = obtener_precio(lista, nombre_producto)
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def datos_sinteticos(n_productos, semilla=0):
+    """Cada supermercado lista ~70% del catálogo, desordenado y con ~2% de nombres repetidos"""
+    rnd = random.Random(semilla)
+    catalogo = [f"Producto sintético {i:06d} 250g" for i in range(n_productos)]
+    datos = {}
+    for tienda in SUPERMERCADOS:
+        lista = [{"nombre": n, "precio": f"${rnd.randint(500, 20000):,}".replace(",", ".") + ",00"}
+                 for n in catalogo if rnd.random() < 0.7]
+        lista += [{"nombre": p["nombre"], "precio": "duplicado"} for p in rnd.sample(lista, len(lista) // 50)]
+        rnd.shuffle(lista)
+        datos[tienda] = lista
+    return datos
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--productos", type=int, default=100_000)
+    parser.add_argument("--productos-lineal", type=int, default=2_000,
+                        help="Tamaño para la versión lineal (cuadrática: no escala a 100k)")
+    args = parser.parse_args()
+
+    fecha = "2025-01-01"
+
+    chico = datos_sinteticos(args.productos_lineal)
+    df_lineal, t_lineal = medir(tabla_lineal, fecha, chico)
+    df_indexado, t_indexado_chico = medir(construir_tabla_precios, fecha, chico)
+    iguales = df_lineal.to_csv(index=False) == df_indexado.to_csv(index=False)
+    print(f"{args.productos_lineal:>7} productos | lineal: {t_lineal:8.3f}s | indexado: {t_indexado_chico:6.3f}s "
+          f"| x{t_lineal / t_indexado_chico:,.0f} | CSV idéntico: {iguales}")
+
+    grande = datos_sinteticos(args.productos)
+    df_grande, t_indexado = medir(construir_tabla_precios, fecha, grande)
+    print(f"{args.productos:>7} productos | indexado: {t_indexado:6.3f}s ({len(df_grande)} filas)")
+
+    if not iguales:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Benchmark de los scrapers de Playwright contra snapshots grabados de cada supermercado.
+
+Cada pedido del navegador se responde desde benchmarks/fixtures/<marca>/<tienda>/, servido por
+un servidor HTTP local (con latencia opcional), así que los tiempos no dependen de los sitios.
+Los de "not" son páginas mínimas armadas a mano con los selectores que usa cada scraper.
+Por scraper se mide el tiempo total, las páginas visitadas, las llamadas a Playwright y los
+productos por segundo; cada corrida agrega una línea JSON (con el commit) a --salida.
+
+    python benchmarks/bench_scrapers.py --grabar --marca not      # graba los snapshots (usa la red)
+    python benchmarks/bench_scrapers.py --marca not --repeticiones 3
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from browser_pool import BrowserPool
+from resource_policy import motivo_bloqueo
+from scrape_all_async_v2 import SUPERMERCADOS
+
+FIXTURES_PATH = os.path.join(RAIZ, "benchmarks", "fixtures")
+SALIDA_PATH = os.path.join(RAIZ, "benchmarks", "resultados", "bench_scrapers.jsonl")
+ARCHIVO_INDICE = "indice.json"  # clave del pedido -> {"url", "archivo", "status", "content_type"}
+
+
+def clave_pedido(request):
+    """Identifica un pedido por método y URL, más un hash del cuerpo si lo tiene (búsquedas GraphQL por POST)"""
+    clave = f"{request.method} {request.url}"
+    if request.post_data:
+        clave += " " + hashlib.sha1(request.post_data.encode("utf-8")).hexdigest()[:12]
+    return clave
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+# -------------------- Servidor local de snapshots --------------------
+class ServidorFixtures:
+    """Sirve FIXTURES_PATH por HTTP en un puerto libre, en un hilo aparte"""
+
+    def __init__(self, directorio=FIXTURES_PATH, latencia_ms=0):
+        latencia = latencia_ms / 1000
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directorio, **kwargs)
+
+            def do_GET(self):
+                if latencia:
+                    time.sleep(latencia)
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _descargar(url):
+    with urllib.request.urlopen(url) as respuesta:
+        return respuesta.read()
+
+
+# -------------------- Conteo de llamadas a Playwright --------------------
+def _envolver(valor, llamadas):
+    if isinstance(valor, list):
+        return [_envolver(v, llamadas) for v in valor]
+    if type(valor).__module__.startswith("playwright."):
+        return Instrumentado(valor, llamadas)
+    return valor
+
+
+class Instrumentado:
+    """Proxy de Page/Locator/ElementHandle que cuenta cada llamada como "Clase.metodo" """
+
+    def __init__(self, objeto, llamadas):
+        self._objeto = objeto
+        self._llamadas = llamadas
+
+    def __getattr__(self, nombre):
+        valor = getattr(self._objeto, nombre)
+        if not callable(valor):
+            return _envolver(valor, self._llamadas)
+        metodo = f"{type(self._objeto).__name__}.{nombre}"
+
+        def llamada(*args, **kwargs):
+            self._llamadas[metodo] += 1
+            resultado = valor(*args, **kwargs)
+            if inspect.isawaitable(resultado):
+                async def esperar():
+                    return _envolver(await resultado, self._llamadas)
+                return esperar()
+            return _envolver(resultado, self._llamadas)
+
+        return llamada
+
+
+# -------------------- Pool que responde desde los snapshots --------------------
+class PoolBench(BrowserPool):
+    """BrowserPool cuyos contextos responden desde los snapshots (o los graban con `grabar`)"""
+
+    def __init__(self, marca, servidor=None, grabar=False, **kwargs):
+        super().__init__(bloquear_recursos=False, **kwargs)
+        self.marca = marca
+        self.servidor = servidor
+        self.grabar = grabar
+        self.indices = {}
+        self.reiniciar_medicion()
+
+    def reiniciar_medicion(self):
+        self.llamadas = Counter()
+        self.pedidos = Counter()  # servidos, faltantes, bloqueados, grabados
+        self.paginas = 0
+
+    def _directorio(self, tienda):
+        return os.path.join(FIXTURES_PATH, self.marca, tienda)
+
+    def indice(self, tienda):
+        if tienda not in self.indices:
+            ruta = os.path.join(self._directorio(tienda), ARCHIVO_INDICE)
+            self.indices[tienda] = {}
+            if os.path.exists(ruta) and not self.grabar:
+                with open(ruta, encoding="utf-8") as f:
+                    self.indices[tienda] = json.load(f)
+        return self.indices[tienda]
+
+    def guardar_indices(self):
+        for tienda, indice in self.indices.items():
+            os.makedirs(self._directorio(tienda), exist_ok=True)
+            with open(os.path.join(self._directorio(tienda), ARCHIVO_INDICE), "w", encoding="utf-8") as f:
+                json.dump(indice, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    async def responder(self, tienda, route):
+        """Responde un pedido del navegador desde los snapshots de la tienda (o lo graba)"""
+        request = route.request
+        # La misma política de recursos que en producción, así se graba y se mide sólo lo necesario
+        if motivo_bloqueo(tienda, request.resource_type, request.url) is not None:
+            self.pedidos["bloqueados"] += 1
+            await route.abort("blockedbyclient")
+            return
+        indice = self.indice(tienda)
+        clave = clave_pedido(request)
+
+        if self.grabar:
+            respuesta = await route.fetch()
+            cuerpo = await respuesta.body()
+            archivo = hashlib.sha1(clave.encode("utf-8")).hexdigest()[:16]
+            os.makedirs(self._directorio(tienda), exist_ok=True)
+            with open(os.path.join(self._directorio(tienda), archivo), "wb") as f:
+                f.write(cuerpo)
+            indice[clave] = {"url": request.url, "archivo": archivo, "status": respuesta.status,
+                             "content_type": respuesta.headers.get("content-type", "")}
+            self.pedidos["grabados"] += 1
+            await route.fulfill(response=respuesta, body=cuerpo)
+            return
+
+        entrada = indice.get(clave)
+        if entrada is None:
+            self.pedidos["faltantes"] += 1
+            await route.fulfill(status=404, body="")
+            return
+        url_local = f"{self.servidor.url}/{self.marca}/{tienda}/{entrada['archivo']}"
+        cuerpo = await asyncio.to_thread(_descargar, url_local)
+        self.pedidos["servidos"] += 1
+        await route.fulfill(status=entrada["status"], body=cuerpo,
+                            headers={"content-type": entrada["content_type"]})
+
+    async def nuevo_contexto(self, tienda, **opciones):
+        context = await self.browser.new_context(**opciones)
+
+        async def manejar(route):
+            await self.responder(tienda, route)
+
+        await context.route("**/*", manejar)
+        return context
+
+    @asynccontextmanager
+    async def pagina(self, tienda, **opciones):
+        async with super().pagina(tienda, **opciones) as page:
+            def al_navegar(frame):
+                if frame == page.main_frame:
+                    self.paginas += 1
+            page.on("framenavigated", al_navegar)
+            yield Instrumentado(page, self.llamadas)
+
+
+# -------------------- Corridas --------------------
+async def medir_tienda(pool, tienda, marca, silencioso):
+    scraper, _ = SUPERMERCADOS[tienda]
+    pool.reiniciar_medicion()
+    error = None
+    productos = []
+    inicio = time.perf_counter()
+    salida = io.StringIO() if silencioso else sys.stdout
+    with contextlib.redirect_stdout(salida):
+        try:
+            productos = await scraper(marca, pool=pool)
+        except Exception as e:
+            error = repr(e)
+    segundos = time.perf_counter() - inicio
+    return {
+        "tienda": tienda,
+        "segundos": round(segundos, 3),
+        "paginas": pool.paginas,
+        "llamadas_playwright": sum(pool.llamadas.values()),
+        "llamadas_por_metodo": dict(sorted(pool.llamadas.items())),
+        "productos": len(productos),
+        "productos_por_segundo": round(len(productos) / segundos, 3) if segundos else None,
+        "pedidos": dict(sorted(pool.pedidos.items())),
+        "error": error,
+    }
+
+
+async def correr(args):
+    marca_dir = args.marca.replace(" ", "_").lower()
+    tiendas = args.tiendas or list(SUPERMERCADOS)
+    if not args.grabar:
+        faltan = [t for t in tiendas if not os.path.exists(os.path.join(FIXTURES_PATH, marca_dir, t, ARCHIVO_INDICE))]
+        if faltan:
+            print(f"⚠️ Sin snapshots para {', '.join(faltan)}: grabarlos con --grabar --marca {args.marca}")
+            tiendas = [t for t in tiendas if t not in faltan]
+        if not tiendas:
+            return []
+
+    with contextlib.ExitStack() as pila:
+        servidor = None if args.grabar else pila.enter_context(ServidorFixtures(latencia_ms=args.latencia_ms))
+        resultados = []
+        async with PoolBench(marca_dir, servidor, grabar=args.grabar, max_usos_contexto=1) as pool:
+            repeticiones = 1 if args.grabar else args.repeticiones
+            for repeticion in range(1, repeticiones + 1):
+                for tienda in tiendas:
+                    resultado = await medir_tienda(pool, tienda, args.marca, not args.verbose)
+                    resultado.update(repeticion=repeticion)
+                    resultados.append(resultado)
+                    estado = "❌ " + resultado["error"] if resultado["error"] else "✅"
+                    print(f"{estado} {tienda:10} {resultado['segundos']:7.2f}s | {resultado['paginas']:3d} páginas | "
+                          f"{resultado['llamadas_playwright']:4d} llamadas | {resultado['productos']:3d} productos")
+            if args.grabar:
+                pool.guardar_indices()
+                print(f"📼 Snapshots grabados en {os.path.join(FIXTURES_PATH, marca_dir)}")
+    return resultados
+
+
+def guardar_resultados(resultados, salida, comunes):
+    """Agrega una línea JSON por resultado (con los campos `comunes` de la corrida) a `salida`"""
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "a", encoding="utf-8") as f:
+        for resultado in resultados:
+            f.write(json.dumps({**comunes, **resultado}, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--marca", default="Not")
+    parser.add_argument("--tiendas", nargs="*", choices=list(SUPERMERCADOS), help="Por defecto, todas")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--latencia-ms", type=int, default=0, help="Demora agregada a cada respuesta local")
+    parser.add_argument("--grabar", action="store_true", help="Grabar los snapshots desde los sitios reales")
+    parser.add_argument("--salida", default=SALIDA_PATH, help="Archivo JSON lines donde se agregan los resultados")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los prints de los scrapers")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(correr(args))
+    if args.grabar or not resultados:
+        return
+
+    comunes = {"commit": commit_actual(), "fecha": datetime.now().isoformat(timespec="seconds"),
+               "marca": args.marca, "latencia_ms": args.latencia_ms}
+    guardar_resultados(resultados, args.salida, comunes)
+    print(f"📝 {len(resultados)} resultados agregados a {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
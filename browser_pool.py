@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+from metrics import span
+from resource_policy import aplicar_politica, estadisticas_vacias
+
+# Argumentos de lanzamiento comunes a todos los supermercados (antes sólo los usaba Coto)
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/114.0.0.0 Safari/537.36"
+)
+
+# Cantidad de scrapeos que atiende un contexto antes de descartarlo
+MAX_USOS_CONTEXTO = 5
+
+
+class BrowserPool:
+    """Un único Chromium compartido, con contextos aislados y reciclados por supermercado"""
+
+    def __init__(self, headless=True, max_usos_contexto=MAX_USOS_CONTEXTO, bloquear_recursos=True):
+        self.headless = headless
+        self.max_usos_contexto = max_usos_contexto
+        self.bloquear_recursos = bloquear_recursos
+        self.recursos = {}  # tienda -> estadísticas de la política de recursos
+        self.browser = None
+        self._playwright = None
+        self._libres = {}  # tienda -> [(context, usos)]
+
+    async def start(self):
+        with span("launch"):
+            self._playwright = await async_playwright().start()
+            self.browser = await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        return self
+
+    async def close(self):
+        for contextos in self._libres.values():
+            for context, _ in contextos:
+                await context.close()
+        self._libres.clear()
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def nuevo_contexto(self, tienda, **opciones):
+        """Crea un contexto nuevo para la tienda (punto de extensión para configurarlo)"""
+        context = await self.browser.new_context(**opciones)
+        if self.bloquear_recursos:
+            estadisticas = self.recursos.setdefault(tienda, estadisticas_vacias())
+            await aplicar_politica(context, tienda, estadisticas)
+        return context
+
+    @asynccontextmanager
+    async def contexto(self, tienda, **opciones):
+        """Presta un contexto de la tienda; se recicla tras `max_usos_contexto` usos"""
+        libres = self._libres.setdefault(tienda, [])
+        if libres:
+            context, usos = libres.pop()
+        else:
+            context, usos = await self.nuevo_contexto(tienda, **opciones), 0
+
+        try:
+            yield context
+        except BaseException:
+            # Un contexto que falló no se reutiliza
+            await asyncio.shield(context.close())
+            raise
+
+        usos += 1
+        if usos >= self.max_usos_contexto:
+            await context.close()
+        else:
+            libres.append((context, usos))
+
+    @asynccontextmanager
+    async def pagina(self, tienda, **opciones):
+        """Abre una pestaña en un contexto de la tienda y la cierra al terminar"""
+        async with self.contexto(tienda, **opciones) as context:
+            page = await context.new_page()
+            try:
+                yield page
+            finally:
+                if not page.is_closed():
+                    await asyncio.shield(page.close())
+
+
+@asynccontextmanager
+async def abrir_pagina(pool, tienda, **opciones):
+    """Pestaña del pool compartido; sin pool lanza un Chromium propio (uso standalone)"""
+    if pool is None:
+        async with BrowserPool(max_usos_contexto=1) as pool_propio:
+            async with pool_propio.pagina(tienda, **opciones) as page:
+                yield page
+    else:
+        async with pool.pagina(tienda, **opciones) as page:
+            yield page
+
+
+@asynccontextmanager
+async def abrir_contexto(pool, tienda, **opciones):
+    """Contexto del pool compartido, para abrir varias pestañas de la misma tienda a la vez"""
+    if pool is None:
+        async with BrowserPool(max_usos_contexto=1) as pool_propio:
+            async with pool_propio.contexto(tienda, **opciones) as context:
+                yield context
+    else:
+        async with pool.contexto(tienda, **opciones) as context:
+            yield context
@@ -1,10 +1,17 @@
+import io
 import os
 import glob
-import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
 
+from data_cache import CargadorIncremental, CACHE_PATH
+from history_store import leer_particion, marca_y_mes, particiones, NOMBRES_MARCA
+from delta_store import (DELTAS_PATH, ARCHIVO_CAMBIOS as ARCHIVO_CAMBIOS_DELTAS, ARCHIVO_FECHAS as ARCHIVO_FECHAS_DELTAS,
+                         leer_cambios, reconstruir)
+from price_aggregates import (AGREGADOS_PATH, ARCHIVO_AGREGADOS, ARCHIVO_OPORTUNIDADES, agregados_desde,
+                              oportunidades_desde, promedio_historico)
+
 # -------------------- Configuración de la página --------------------
 st.set_page_config(
     page_title="Price Scraper Dashboard",
@@ -25,22 +32,212 @@ SUPER_RENAMES = {
 }
 
 # -------------------- Carga y cache de datos --------------------
-@st.cache_data
-def load_data(filenames):
-    dfs = []
-    for fp in filenames:
-        df = pd.read_csv(fp, parse_dates=['fecha'])
-        marca = os.path.basename(fp).split('_')[1]
-        df['brand'] = marca.replace('felices', 'Felices las Vacas') \
-                           .replace('vegetalex', 'Vegetalex') \
-                           .replace('not', 'Not')
-        dfs.append(df)
-    df = pd.concat(dfs, ignore_index=True)
+def leer_csv(fp):
+    df = pd.read_csv(fp, parse_dates=['fecha'])
+    marca = os.path.basename(fp).split('_')[1]
+    df['brand'] = marca.replace('felices', 'Felices las Vacas') \
+                       .replace('vegetalex', 'Vegetalex') \
+                       .replace('not', 'Not')
+    df.rename(columns={'producto_unificado':'Producto'}, inplace=True)
+    return df
+
+def leer_particion_dashboard(ruta):
+    """Lee de una partición del histórico sólo las columnas que usa el dashboard"""
+    marca, _ = marca_y_mes(ruta)
+    df = leer_particion(ruta, marca, columnas=['fecha', 'producto_unificado'] + SUPERS)
+    df['brand'] = NOMBRES_MARCA.get(marca, marca)
+    df = df.drop(columns='marca')
+    df.rename(columns={'producto_unificado':'Producto'}, inplace=True)
+    return df
+
+def archivos_deltas(ruta_fechas):
+    """fechas.csv y cambios.csv de una marca: un reproceso reescribe cambios.csv sin tocar fechas.csv"""
+    return [ruta_fechas, os.path.join(os.path.dirname(ruta_fechas), ARCHIVO_CAMBIOS_DELTAS)]
+
+def _deltas_dashboard(df, marca):
+    df = df[['fecha', 'producto_unificado'] + SUPERS]
+    df['brand'] = NOMBRES_MARCA.get(marca, marca)
     df.rename(columns={'producto_unificado':'Producto'}, inplace=True)
     return df
 
-file_list = sorted(glob.glob("Data/Cleaned/*.csv"))
-df = load_data(filenames=file_list)
+def leer_deltas_dashboard(ruta_fechas):
+    """Reconstruye los snapshots diarios de una marca guardada por cambios"""
+    marca = os.path.basename(os.path.dirname(ruta_fechas)).split("=", 1)[1]
+    return _deltas_dashboard(reconstruir(*leer_cambios(marca, DELTAS_PATH)), marca)
+
+def fechas_agregadas(ruta, tamanio):
+    """Columna fecha de las filas agregadas a un CSV después de sus primeros `tamanio` bytes"""
+    with open(ruta, "rb") as f:
+        encabezado = f.readline()
+        f.seek(tamanio)
+        resto = f.read()
+    return pd.read_csv(io.BytesIO(encabezado + resto), parse_dates=['fecha'])['fecha']
+
+def extender_deltas_dashboard(ruta_fechas, df, tamanios):
+    """Caso diario (fechas.csv y cambios.csv sólo crecieron): reconstruye desde el primer día o
+    evento agregado y conserva del frame cacheado los días anteriores, que no cambian"""
+    marca = os.path.basename(os.path.dirname(ruta_fechas)).split("=", 1)[1]
+    desde = pd.concat([fechas_agregadas(ruta, tamanios[ruta]) for ruta in archivos_deltas(ruta_fechas)]).min()
+    if pd.isna(desde):
+        return df
+    nuevos = _deltas_dashboard(reconstruir(*leer_cambios(marca, DELTAS_PATH), desde=desde), marca)
+    return pd.concat([df[df['fecha'] < desde], nuevos], ignore_index=True)
+
+# Los cargadores viven mientras corre el servidor y sólo parsean archivos nuevos o modificados.
+# El DataFrame devuelto es compartido: el resto del script no debe modificarlo in place.
+@st.cache_resource
+def cargador(fuente):
+    if fuente == "historial":
+        return CargadorIncremental(leer_particion_dashboard, os.path.join(CACHE_PATH, "dashboard_historial.pkl"))
+    if fuente == "deltas":
+        return CargadorIncremental(leer_deltas_dashboard, os.path.join(CACHE_PATH, "dashboard_deltas.pkl"),
+                                   archivos=archivos_deltas, extender=extender_deltas_dashboard)
+    if fuente in ("agregados", "oportunidades"):
+        return CargadorIncremental(pd.read_parquet)
+    return CargadorIncremental(leer_csv, os.path.join(CACHE_PATH, "dashboard_csv.pkl"))
+
+def load_data():
+    # Data/Deltas sólo existe con el almacenamiento por cambios, y en ese modo el histórico Parquet
+    # deja de actualizarse: tiene prioridad. Si no, el histórico, y los CSV de Data/Cleaned como respaldo
+    # Una entrada por marca (fechas.csv), que se vuelve a leer si cambia fechas.csv o cambios.csv
+    rutas = sorted(glob.glob(os.path.join(DELTAS_PATH, "marca=*", ARCHIVO_FECHAS_DELTAS)))
+    if rutas:
+        return cargador("deltas").cargar(rutas), "deltas"
+    rutas = [ruta for _, _, ruta in particiones()]
+    if rutas:
+        return cargador("historial").cargar(rutas), "historial"
+    return cargador("csv").cargar(sorted(glob.glob("Data/Cleaned/*.csv"))), "csv"
+
+@st.cache_data(max_entries=1)
+def agregados_calculados(_df, version):
+    return agregados_desde(_df, marca_col='brand', producto_col='Producto')
+
+def load_agregados(df, version):
+    # Tabla materializada por la unificación; sin ella se calcula a partir de los datos cargados
+    ruta = os.path.join(AGREGADOS_PATH, ARCHIVO_AGREGADOS)
+    if os.path.exists(ruta):
+        agregados = cargador("agregados").cargar([ruta])
+        agregados = agregados.assign(marca=agregados['marca'].map(lambda m: NOMBRES_MARCA.get(m, m)))
+        return agregados
+    return agregados_calculados(df, version)
+
+def load_oportunidades():
+    # Top-N por marca y fecha que emite la unificación (vacío si todavía no existe)
+    ruta = os.path.join(AGREGADOS_PATH, ARCHIVO_OPORTUNIDADES)
+    if not os.path.exists(ruta):
+        return None
+    oportunidades = cargador("oportunidades").cargar([ruta])
+    return oportunidades.assign(marca=oportunidades['marca'].map(lambda m: NOMBRES_MARCA.get(m, m)))
+
+df, fuente = load_data()
+agregados = load_agregados(df, cargador(fuente).version)
+oportunidades = load_oportunidades()
+
+# Identifica los archivos detrás de df, agregados y oportunidades: clave de las vistas cacheadas
+version = (fuente, cargador(fuente).version, cargador("agregados").version, cargador("oportunidades").version)
+
+# -------------------- Vistas derivadas (cacheadas) --------------------
+# Cada vista se calcula una vez por combinación de filtros y versión de datos, con LRU acotado.
+# Los argumentos con "_" no forman parte de la clave: `version` ya identifica esos datos.
+MAX_VISTAS = 32
+
+def filtrar_marca(df, marca):
+    return df if marca == "Todas" else df[df['brand'] == marca]
+
+@st.cache_data(max_entries=MAX_VISTAS)
+def opciones(_df, marca, version):
+    """Fechas (más reciente primero) y productos disponibles para la marca"""
+    df = filtrar_marca(_df, marca)
+    return sorted(df['fecha'].unique(), reverse=True), sorted(df['Producto'].unique())
+
+@st.cache_data(max_entries=MAX_VISTAS)
+def promedio(_agregados, marca, version):
+    return (
+        promedio_historico(_agregados, marcas=None if marca == "Todas" else [marca])
+        .rename_axis('Producto')
+        .reset_index()
+    )
+
+@st.cache_data(max_entries=MAX_VISTAS)
+def tabla_precios(_df, _agregados, marca, fecha, version):
+    """Precios de la fecha por producto y supermercado, con el promedio histórico"""
+    df = filtrar_marca(_df, marca)
+    df_latest = df[df['fecha'] == fecha].merge(promedio(_agregados, marca, version), on='Producto')
+
+    pivot = df_latest.pivot_table(
+        index='Producto',
+        values=SUPERS,
+        aggfunc='first'
+    )
+    pivot['Promedio histórico'] = df_latest.set_index('Producto')['avg_precio']
+    pivot.index.name = "Producto"
+    return pivot.rename(columns=SUPER_RENAMES)
+
+@st.cache_resource(max_entries=MAX_VISTAS)
+def tabla_estilada(_df, _agregados, marca, fecha, version):
+    pivot = tabla_precios(_df, _agregados, marca, fecha, version)
+
+    # Columnas de supermercados únicamente (excluyendo promedio histórico)
+    cols_supers = list(SUPER_RENAMES.values())
+    cols_supers_presentes = [col for col in cols_supers if col in pivot.columns]
+
+    return (
+        pivot
+          .style
+          .format("{:.2f}")
+          .highlight_max(axis=1, subset=cols_supers_presentes, color='crimson')
+          .highlight_min(axis=1, subset=cols_supers_presentes, color='forestgreen')
+    )
+
+@st.cache_data(max_entries=MAX_VISTAS)
+def grafico(_df, marca, producto, version):
+    """Precio por supermercado del producto en los últimos 30 días de la marca"""
+    df = filtrar_marca(_df, marca)
+    ultimo_dia = df['fecha'].max()
+    df_prod = df[(df['fecha'] >= (ultimo_dia - timedelta(days=30))) & (df['Producto'] == producto)]
+    df_long = df_prod.melt(
+        id_vars=['fecha', 'Producto'],
+        value_vars=SUPERS,
+        var_name='supermercado',
+        value_name='precio'
+    ).dropna(subset=['precio'])
+
+    return df_long.pivot(
+        index='fecha',
+        columns='supermercado',
+        values='precio'
+    )
+
+@st.cache_data(max_entries=MAX_VISTAS)
+def oportunidades_vista(_df, _agregados, _oportunidades, marca, version):
+    """Top 5 de ahorro en la última fecha de la marca"""
+    df = filtrar_marca(_df, marca)
+
+    # Usar la última fecha real (independiente del filtro de fecha del sidebar)
+    fecha_ultima = df['fecha'].max()
+    marcas_del_dia = df.loc[df['fecha'] == fecha_ultima, 'brand'].unique()
+
+    # Lookup en la tabla precalculada; "Todas" es la unión de las tablas de cada marca
+    opp = None
+    if _oportunidades is not None:
+        del_dia = _oportunidades[(_oportunidades['fecha'] == fecha_ultima)
+                                 & _oportunidades['marca'].isin(marcas_del_dia)]
+        if set(marcas_del_dia) <= set(del_dia['marca']):
+            opp = del_dia
+
+    if opp is None:
+        # Sin tabla (o sin esa fecha): mínimo y supermercado por fila con numpy sobre la última fecha
+        df_ultimo = df[df['fecha'] == fecha_ultima].rename(columns={'brand': 'marca', 'Producto': 'producto_unificado'})
+        avg_hist = promedio(_agregados, marca, version)
+        opp = oportunidades_desde(df_ultimo, avg_hist.set_index('Producto')['avg_precio'])
+
+    # Top 5 productos con mayor porcentaje de ahorro
+    return (
+        opp.rename(columns={'producto_unificado': 'Producto'})
+           .assign(super_min=lambda d: d['super_min'].map(SUPER_RENAMES))
+           .sort_values('ahorro_pct', ascending=False, kind='stable')
+           .head(5)
+    )
 
 # Obtener la fecha más reciente en el DataFrame
 ultima_fecha = df['fecha'].max().strftime("%d-%m-%Y")
@@ -57,11 +254,9 @@ st.markdown(
 st.sidebar.header("Filtros")
 marcas = ["Todas"] + sorted(df['brand'].unique())
 marca_sel = st.sidebar.selectbox("Marca", marcas)
-if marca_sel != "Todas":
-    df = df[df['brand'] == marca_sel]
+fechas_disponibles, productos = opciones(df, marca_sel, version)
 
 # -------------------- Filtro de fecha (solo para la tabla) --------------------
-fechas_disponibles = sorted(df['fecha'].unique(), reverse=True)
 fecha_sel = st.sidebar.selectbox(
     "Fecha",
     fechas_disponibles,
@@ -86,49 +281,10 @@ st.sidebar.markdown(
 )
 
 
-df_latest = df[df['fecha'] == fecha_sel].copy()
-
-# -------------------- Precio promedio histórico --------------------
-df_long_all = df.melt(
-    id_vars=['fecha', 'Producto'],
-    value_vars=SUPERS,
-    var_name='supermercado',
-    value_name='precio'
-).dropna(subset=['precio'])
-
-avg_hist = (
-    df_long_all
-    .groupby('Producto')['precio']
-    .mean()
-    .reset_index(name='avg_precio')
-)
-
-# Unir promedio histórico a la tabla de última fecha
-df_latest = df_latest.merge(avg_hist, on='Producto')
-
 # -------------------- 1) Tabla dinámica de precios actuales --------------------
 st.subheader(f"Precios del {fecha_sel.strftime('%d-%m-%Y')}")
 
-pivot = df_latest.pivot_table(
-    index='Producto',
-    values=SUPERS,
-    aggfunc='first'
-)
-pivot['Promedio histórico'] = df_latest.set_index('Producto')['avg_precio']
-pivot.index.name = "Producto"
-pivot = pivot.rename(columns=SUPER_RENAMES)
-
-# Columnas de supermercados únicamente (excluyendo promedio histórico)
-cols_supers = list(SUPER_RENAMES.values())
-cols_supers_presentes = [col for col in cols_supers if col in pivot.columns]
-
-styled = (
-    pivot
-      .style
-      .format("{:.2f}")
-      .highlight_max(axis=1, subset=cols_supers_presentes, color='crimson')
-      .highlight_min(axis=1, subset=cols_supers_presentes, color='forestgreen')
-)
+styled = tabla_estilada(df, agregados, marca_sel, fecha_sel, version)
 
 st.dataframe(styled, use_container_width=True)
 
@@ -146,51 +302,16 @@ st.markdown(
 st.subheader("Evolución en los últimos 30 días por producto")
 producto_sel = st.selectbox(
     "Seleccioná un producto:",
-    sorted(df['Producto'].unique())
+    productos
 )
 
-ultimo_dia = df['fecha'].max()
-df_ultimos_30 = df[df['fecha'] >= (ultimo_dia - timedelta(days=30))]
-df_long_30 = df_ultimos_30.melt(
-    id_vars=['fecha', 'Producto'],
-    value_vars=SUPERS,
-    var_name='supermercado',
-    value_name='precio'
-).dropna(subset=['precio'])
-
-df_prod = df_long_30[df_long_30['Producto'] == producto_sel]
-
-chart_df = df_prod.pivot(
-    index='fecha',
-    columns='supermercado',
-    values='precio'
-)
+chart_df = grafico(df, marca_sel, producto_sel, version)
 st.line_chart(chart_df)
 
 # -------------------- 3) Oportunidades de ahorro --------------------
 st.subheader("Oportunidades de hoy (con respecto al promedio histórico)")
 
-# Calcular precio mínimo actual y supermercado correspondiente
-def min_precio_y_super(row):
-    precios = row[SUPERS]
-    if precios.isnull().all():
-        return pd.Series([np.nan, None])
-    min_precio = precios.min()
-    super_min = precios.idxmin()
-    return pd.Series([min_precio, SUPER_RENAMES[super_min]])
-
-# Usar la última fecha real (independiente del filtro del sidebar)
-df_ultimo = df[df['fecha'] == df['fecha'].max()].copy()
-
-# Calcular promedio histórico nuevamente para asegurar consistencia
-df_ultimo = df_ultimo.merge(avg_hist, on='Producto')
-
-# Calcular precio mínimo actual y supermercado correspondiente
-df_ultimo[['min_precio', 'super_min']] = df_ultimo.apply(min_precio_y_super, axis=1)
-df_ultimo['ahorro_pct'] = 1 - (df_ultimo['min_precio'] / df_ultimo['avg_precio'])
-
-# Top 10 productos con mayor porcentaje de ahorro
-opp = df_ultimo.sort_values('ahorro_pct', ascending=False).head(5)
+opp = oportunidades_vista(df, agregados, oportunidades, marca_sel, version)
 
 cols = st.columns(len(opp))
 for i, (_, row) in enumerate(opp.iterrows()):
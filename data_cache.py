@@ -0,0 +1,140 @@
+import hashlib
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+# Caché en disco de los archivos ya parseados (no se versiona)
+CACHE_PATH = ".cache"
+
+
+def hash_archivo(ruta, limite=None):
+    """Hash del contenido (o de sus primeros `limite` bytes)"""
+    h = hashlib.blake2b(digest_size=16)
+    restante = float("inf") if limite is None else limite
+    with open(ruta, "rb") as f:
+        while restante > 0:
+            bloque = f.read(int(min(1 << 20, restante)))
+            if not bloque:
+                break
+            h.update(bloque)
+            restante -= len(bloque)
+    return h.hexdigest()
+
+
+class CargadorIncremental:
+    """Concatena DataFrames de varios archivos parseando sólo los nuevos o modificados.
+
+    Cada archivo se identifica por ruta + mtime + tamaño; si sólo cambió el mtime (por ejemplo
+    tras un checkout de git) se compara un hash del contenido antes de volver a parsearlo. Con
+    `archivos`, una entrada depende de varios archivos (ruta -> [archivos]) y se vuelve a leer
+    si cambia cualquiera de ellos. Con `extender`, una entrada cuyos archivos sólo crecieron al
+    final (el contenido anterior está intacto) se actualiza con
+    `extender(ruta, df_anterior, {archivo: tamaño anterior})` en lugar de leerse de nuevo.
+    Las entradas se guardan en `cache_file` para sobrevivir a reinicios del proceso. Una misma
+    instancia puede compartirse entre sesiones (hilos) del dashboard: cada carga es exclusiva.
+    """
+
+    def __init__(self, lector, cache_file=None, archivos=None, extender=None):
+        self.lector = lector  # ruta -> DataFrame
+        self.archivos = archivos or (lambda ruta: [ruta])
+        self.extender = extender
+        self.cache_file = cache_file
+        self.entradas = {}    # ruta -> {"archivos": {archivo: {"mtime_ns", "size", "hash"}}, "df"}
+        self.rutas = []
+        self.df = None
+        self.parseados = 0    # archivos parseados en la última carga
+        self._lock = threading.Lock()
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "rb") as f:
+                    # Las entradas con otro formato (cachés viejas) se vuelven a leer
+                    self.entradas = {r: e for r, e in pickle.load(f).items() if "archivos" in e}
+            except Exception as e:
+                print(f"⚠️ Caché ilegible, se descarta: {cache_file} ({repr(e)})")
+                self.entradas = {}
+
+    @property
+    def version(self):
+        """(ruta, mtime y tamaño de cada archivo) de la última carga: cambia cuando cambian los datos"""
+        with self._lock:
+            return tuple((r, tuple((a, f["mtime_ns"], f["size"]) for a, f in self.entradas[r]["archivos"].items()))
+                         for r in self.rutas)
+
+    @staticmethod
+    def _firma(archivo):
+        stat = os.stat(archivo)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": hash_archivo(archivo)}
+
+    def _vigente(self, ruta):
+        entrada = self.entradas.get(ruta)
+        if entrada is None or sorted(entrada["archivos"]) != sorted(self.archivos(ruta)):
+            return False
+        for archivo, firma in entrada["archivos"].items():
+            stat = os.stat(archivo)
+            if firma["size"] != stat.st_size:
+                return False
+            if firma["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            if firma["hash"] != hash_archivo(archivo):
+                return False
+            firma["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def _solo_crecio(self, ruta):
+        entrada = self.entradas.get(ruta)
+        if entrada is None or sorted(entrada["archivos"]) != sorted(self.archivos(ruta)):
+            return False
+        return all(os.stat(archivo).st_size >= firma["size"] and hash_archivo(archivo, firma["size"]) == firma["hash"]
+                   for archivo, firma in entrada["archivos"].items())
+
+    def _leer(self, ruta):
+        if self.extender is not None and self._solo_crecio(ruta):
+            entrada = self.entradas[ruta]
+            return self.extender(ruta, entrada["df"], {a: f["size"] for a, f in entrada["archivos"].items()})
+        return self.lector(ruta)
+
+    def cargar(self, rutas):
+        with self._lock:
+            return self._cargar(list(rutas))
+
+    def _cargar(self, rutas):
+        nuevas, modificadas = [], []
+        for ruta in rutas:
+            if self._vigente(ruta):
+                continue
+            (modificadas if ruta in self.entradas else nuevas).append(ruta)
+            df = self._leer(ruta)
+            self.entradas[ruta] = {
+                "archivos": {archivo: self._firma(archivo) for archivo in self.archivos(ruta)},
+                "df": df,
+            }
+        borradas = [ruta for ruta in self.entradas if ruta not in set(rutas)]
+        for ruta in borradas:
+            del self.entradas[ruta]
+        self.parseados = len(nuevas) + len(modificadas)
+
+        solo_agregados = (self.df is not None and not modificadas and not borradas
+                          and rutas[:len(self.rutas)] == self.rutas)
+        if solo_agregados:
+            # Caso diario: se agregan archivos nuevos al final del frame ya armado
+            if nuevas:
+                self.df = pd.concat([self.df] + [self.entradas[r]["df"] for r in nuevas], ignore_index=True)
+        else:
+            dfs = [self.entradas[r]["df"] for r in rutas]
+            self.df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+        self.rutas = rutas
+
+        if self.parseados or borradas:
+            self._guardar()
+        return self.df
+
+    def _guardar(self):
+        if not self.cache_file:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        temporal = self.cache_file + ".tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump(self.entradas, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, self.cache_file)
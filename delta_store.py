@@ -0,0 +1,160 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from history_store import COLUMNAS, COLUMNAS_PRECIOS, PATRON_CLEANED, normalizar_tipos
+
+# Almacenamiento por cambios: en lugar de un snapshot por día se guarda, por marca, una fila
+# cada vez que cambia algo de un producto (vigente desde `fecha`) y una baja cuando desaparece.
+#   Data/Deltas/marca=not/cambios.csv   fecha, producto_unificado, producto_representativo, precios..., baja
+#   Data/Deltas/marca=not/fechas.csv    días relevados (un día sin cambios no agrega eventos)
+# Ambos archivos sólo crecen al final, así que cada corrida diaria es un diff chico en git.
+DELTAS_PATH = os.path.join("Data", "Deltas")
+ARCHIVO_CAMBIOS = "cambios.csv"
+ARCHIVO_FECHAS = "fechas.csv"
+
+VALORES = ['producto_representativo'] + COLUMNAS_PRECIOS
+COLUMNAS_CAMBIOS = ['fecha', 'producto_unificado'] + VALORES + ['baja']
+
+
+def _rutas(marca, base):
+    directorio = os.path.join(base, f"marca={marca}")
+    return os.path.join(directorio, ARCHIVO_CAMBIOS), os.path.join(directorio, ARCHIVO_FECHAS)
+
+
+def codificar(snapshots):
+    """Eventos de cambio de una serie de snapshots diarios (formato del histórico)"""
+    snapshots = normalizar_tipos(snapshots)
+    fechas = np.sort(snapshots['fecha'].unique())
+    productos = np.sort(snapshots['producto_unificado'].unique())
+    grilla = pd.MultiIndex.from_product([productos, fechas], names=['producto_unificado', 'fecha'])
+
+    estado = snapshots.set_index(['producto_unificado', 'fecha'])[VALORES].reindex(grilla)
+    estado['baja'] = ~grilla.isin(snapshots.set_index(['producto_unificado', 'fecha']).index)
+
+    # Una fila es evento si difiere de la del día anterior del mismo producto (NaN == NaN)
+    anterior = estado.groupby(level='producto_unificado').shift(1)
+    iguales = ((estado == anterior).fillna(False).astype(bool) | (estado.isna() & anterior.isna())).all(axis=1)
+    primera = estado.groupby(level='producto_unificado').cumcount() == 0
+    eventos = estado[(~iguales | primera) & ~(primera & estado['baja'])]
+
+    eventos = eventos.reset_index()
+    eventos['baja'] = eventos['baja'].astype('int8')
+    return eventos.sort_values(['fecha', 'producto_unificado'], ignore_index=True)[COLUMNAS_CAMBIOS]
+
+
+def leer_cambios(marca, base=DELTAS_PATH):
+    ruta_cambios, ruta_fechas = _rutas(marca, base)
+    if not os.path.exists(ruta_cambios):
+        return pd.DataFrame(columns=COLUMNAS_CAMBIOS), pd.DatetimeIndex([])
+    cambios = pd.read_csv(ruta_cambios, parse_dates=['fecha'])
+    fechas = pd.DatetimeIndex(pd.read_csv(ruta_fechas, parse_dates=['fecha'])['fecha'])
+    return cambios, fechas
+
+
+def reconstruir(cambios, fechas, desde=None, hasta=None):
+    """Snapshots diarios de las `fechas` pedidas, arrastrando cada evento hasta el siguiente"""
+    fechas = pd.DatetimeIndex(fechas).sort_values()
+    if hasta is not None:
+        fechas = fechas[fechas <= pd.Timestamp(hasta)]
+        cambios = cambios[cambios['fecha'] <= pd.Timestamp(hasta)]
+    if desde is not None:
+        # Los eventos anteriores a `desde` siguen vigentes: se consolidan en `desde`
+        fechas = fechas[fechas >= pd.Timestamp(desde)]
+    if len(fechas) == 0 or cambios.empty:
+        return normalizar_tipos(pd.DataFrame(columns=COLUMNAS))
+
+    productos = np.sort(cambios['producto_unificado'].unique())
+    # Cada evento cae en el primer día pedido desde su fecha de vigencia; si varios caen en el
+    # mismo día (eventos anteriores a `desde`) vale el último
+    cambios = cambios.sort_values('fecha', kind='stable')
+    posicion = np.searchsorted(fechas.values, cambios['fecha'].values, side='left')
+    cambios = cambios.assign(fecha=fechas.values[np.minimum(posicion, len(fechas) - 1)])
+    cambios = cambios[posicion < len(fechas)].drop_duplicates(['producto_unificado', 'fecha'], keep='last')
+    cambios = cambios.reset_index(drop=True)
+
+    # Para cada producto y día, el número del último evento vigente (se arrastra la fila entera,
+    # así un precio faltante en el evento no toma el valor de un evento anterior)
+    grilla = pd.MultiIndex.from_product([productos, fechas], names=['producto_unificado', 'fecha'])
+    numero = pd.Series(np.arange(len(cambios)), index=pd.MultiIndex.from_frame(cambios[['producto_unificado', 'fecha']]))
+    vigente = numero.reindex(grilla).groupby(level='producto_unificado').ffill().dropna().astype('int64')
+
+    snapshots = cambios.iloc[vigente.to_numpy()].assign(fecha=vigente.index.get_level_values('fecha'))
+    snapshots = snapshots[snapshots['baja'] == 0]
+    snapshots = snapshots.sort_values(['fecha', 'producto_unificado'], ignore_index=True)
+    return normalizar_tipos(snapshots)
+
+
+def leer_deltas(marcas=None, desde=None, hasta=None, base=DELTAS_PATH):
+    """Como `leer_historial`, pero reconstruyendo los snapshots desde los cambios"""
+    dfs = []
+    for directorio in sorted(glob.glob(os.path.join(base, "marca=*"))):
+        marca = os.path.basename(directorio).split("=", 1)[1]
+        if marcas is not None and marca not in marcas:
+            continue
+        df = reconstruir(*leer_cambios(marca, base), desde=desde, hasta=hasta)
+        df['marca'] = marca
+        dfs.append(df)
+    if not dfs:
+        return pd.DataFrame(columns=COLUMNAS + ['marca'])
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _escribir(ruta, df, agregar):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    df = df.assign(fecha=df['fecha'].dt.strftime('%Y-%m-%d'))
+    if agregar and os.path.exists(ruta):
+        df.to_csv(ruta, mode='a', header=False, index=False)
+    else:
+        df.to_csv(ruta, index=False)
+
+
+def registrar_dias(df_unificado, marca, base=DELTAS_PATH):
+    """Registra los días de `df_unificado`: agrega al final si son posteriores al último día
+    registrado; si no (reproceso o carga atrasada), recodifica la marca completa"""
+    df_nuevo = normalizar_tipos(df_unificado)
+    fechas_nuevas = pd.DatetimeIndex(df_nuevo['fecha'].unique()).sort_values()
+    cambios, fechas = leer_cambios(marca, base)
+    ruta_cambios, ruta_fechas = _rutas(marca, base)
+
+    if len(fechas) == 0 or fechas_nuevas[0] > fechas.max():
+        # Caso diario: sólo hace falta el estado del último día para saber qué cambió
+        anterior = reconstruir(cambios, fechas, desde=fechas.max()) if len(fechas) else df_nuevo.iloc[:0]
+        eventos = codificar(pd.concat([anterior, df_nuevo], ignore_index=True))
+        if len(fechas):
+            eventos = eventos[eventos['fecha'] > fechas.max()]
+        _escribir(ruta_cambios, eventos, agregar=True)
+        _escribir(ruta_fechas, pd.DataFrame({'fecha': fechas_nuevas}), agregar=True)
+        return len(eventos)
+
+    snapshots = reconstruir(cambios, fechas)
+    snapshots = snapshots[~snapshots['fecha'].isin(fechas_nuevas)]
+    snapshots = pd.concat([snapshots, df_nuevo], ignore_index=True)
+    eventos = codificar(snapshots)
+    _escribir(ruta_cambios, eventos, agregar=False)
+    _escribir(ruta_fechas, pd.DataFrame({'fecha': fechas.union(fechas_nuevas)}), agregar=False)
+    return len(eventos)
+
+
+def importar_csvs(cleaned_directory=os.path.join("Data", "Cleaned"), base=DELTAS_PATH):
+    """Codifica como cambios todos los CSV de Data/Cleaned (migración inicial o reconstrucción)"""
+    por_marca = {}
+    for ruta in sorted(glob.glob(os.path.join(cleaned_directory, "productos_*_unificados_*.csv"))):
+        match = PATRON_CLEANED.match(os.path.basename(ruta))
+        if not match:
+            print(f"⚠️ Nombre de archivo inesperado, se omite: {ruta}")
+            continue
+        por_marca.setdefault(match.group(1), []).append(pd.read_csv(ruta))
+    for marca, dfs in por_marca.items():
+        snapshots = normalizar_tipos(pd.concat(dfs, ignore_index=True))
+        eventos = codificar(snapshots)
+        ruta_cambios, ruta_fechas = _rutas(marca, base)
+        _escribir(ruta_cambios, eventos, agregar=False)
+        _escribir(ruta_fechas, pd.DataFrame({'fecha': np.sort(snapshots['fecha'].unique())}), agregar=False)
+        print(f"🧩 {marca}: {len(snapshots)} filas en {len(dfs)} días -> {len(eventos)} cambios")
+
+
+if __name__ == "__main__":
+    importar_csvs()
@@ -0,0 +1,123 @@
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Histórico consolidado en Parquet, particionado por marca y mes:
+#   Data/History/marca=not/mes=2025-08/precios.parquet
+HISTORY_PATH = os.path.join("Data", "History")
+ARCHIVO_PARTICION = "precios.parquet"
+
+COLUMNAS_PRECIOS = ['carrefour', 'coope', 'coto', 'dia', 'disco', 'vea']
+COLUMNAS = ['fecha', 'producto_unificado', 'producto_representativo'] + COLUMNAS_PRECIOS
+
+# Marca tal como aparece en los nombres de archivo -> nombre para mostrar
+NOMBRES_MARCA = {
+    'not': 'Not',
+    'vegetalex': 'Vegetalex',
+    'felices_las_vacas': 'Felices las Vacas',
+}
+
+PATRON_CLEANED = re.compile(r'productos_(\w+)_unificados_(\d{4}-\d{2}-\d{2})\.csv')
+
+
+def normalizar_tipos(df):
+    """Columnas y tipos fijos del histórico: fecha datetime, nombres string y precios float64"""
+    df = df.copy()
+    for col in COLUMNAS_PRECIOS:
+        if col not in df.columns:
+            df[col] = np.nan
+    if 'producto_representativo' not in df.columns:
+        df['producto_representativo'] = df['producto_unificado']
+    df = df[COLUMNAS]
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df['producto_unificado'] = df['producto_unificado'].astype('string')
+    df['producto_representativo'] = df['producto_representativo'].astype('string')
+    df[COLUMNAS_PRECIOS] = df[COLUMNAS_PRECIOS].astype('float64')
+    return df
+
+
+def ruta_particion(marca, mes, base=HISTORY_PATH):
+    return os.path.join(base, f"marca={marca}", f"mes={mes}", ARCHIVO_PARTICION)
+
+
+def agregar_dia(df_unificado, marca, base=HISTORY_PATH):
+    """Agrega (o reemplaza) las fechas de `df_unificado` en la partición de la marca y el mes"""
+    df_nuevo = normalizar_tipos(df_unificado)
+    rutas = []
+    for mes, df_mes in df_nuevo.groupby(df_nuevo['fecha'].dt.strftime('%Y-%m')):
+        ruta = ruta_particion(marca, mes, base)
+        if os.path.exists(ruta):
+            df_existente = pd.read_parquet(ruta)
+            # Reprocesar un día reemplaza sus filas en lugar de duplicarlas
+            df_existente = df_existente[~df_existente['fecha'].isin(df_mes['fecha'].unique())]
+            df_mes = pd.concat([df_existente, df_mes], ignore_index=True)
+        df_mes = df_mes.sort_values(['fecha', 'producto_unificado'], ignore_index=True)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        df_mes.to_parquet(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
+
+
+def marca_y_mes(ruta):
+    """("not", "2025-08") a partir de la ruta de una partición"""
+    dir_mes = os.path.dirname(ruta)
+    marca = os.path.basename(os.path.dirname(dir_mes)).split("=", 1)[1]
+    mes = os.path.basename(dir_mes).split("=", 1)[1]
+    return marca, mes
+
+
+def particiones(marcas=None, desde=None, hasta=None, base=HISTORY_PATH):
+    """Lista [(marca, mes, ruta)] de las particiones que pueden tener datos de esas marcas y fechas"""
+    mes_desde = pd.Timestamp(desde).strftime('%Y-%m') if desde is not None else None
+    mes_hasta = pd.Timestamp(hasta).strftime('%Y-%m') if hasta is not None else None
+    encontradas = []
+    for ruta in sorted(glob.glob(os.path.join(base, "marca=*", "mes=*", ARCHIVO_PARTICION))):
+        marca, mes = marca_y_mes(ruta)
+        if marcas is not None and marca not in marcas:
+            continue
+        if (mes_desde and mes < mes_desde) or (mes_hasta and mes > mes_hasta):
+            continue
+        encontradas.append((marca, mes, ruta))
+    return encontradas
+
+
+def leer_particion(ruta, marca, columnas=None):
+    df = pd.read_parquet(ruta, columns=columnas)
+    df['marca'] = marca
+    return df
+
+
+def leer_historial(marcas=None, desde=None, hasta=None, columnas=None, base=HISTORY_PATH):
+    """Lee sólo las particiones y columnas pedidas; agrega la columna `marca`"""
+    if columnas is not None and (desde is not None or hasta is not None) and 'fecha' not in columnas:
+        columnas = ['fecha'] + list(columnas)
+    dfs = [leer_particion(ruta, marca, columnas) for marca, _, ruta in particiones(marcas, desde, hasta, base)]
+    if not dfs:
+        return pd.DataFrame(columns=(columnas or COLUMNAS) + ['marca'])
+    df = pd.concat(dfs, ignore_index=True)
+    if desde is not None:
+        df = df[df['fecha'] >= pd.Timestamp(desde)]
+    if hasta is not None:
+        df = df[df['fecha'] <= pd.Timestamp(hasta)]
+    return df.reset_index(drop=True)
+
+
+def importar_csvs(cleaned_directory=os.path.join("Data", "Cleaned"), base=HISTORY_PATH):
+    """Carga en el histórico todos los CSV de Data/Cleaned (migración inicial o reconstrucción)"""
+    por_marca = {}
+    for ruta in sorted(glob.glob(os.path.join(cleaned_directory, "productos_*_unificados_*.csv"))):
+        match = PATRON_CLEANED.match(os.path.basename(ruta))
+        if not match:
+            print(f"⚠️ Nombre de archivo inesperado, se omite: {ruta}")
+            continue
+        por_marca.setdefault(match.group(1), []).append(pd.read_csv(ruta))
+    for marca, dfs in por_marca.items():
+        agregar_dia(pd.concat(dfs, ignore_index=True), marca, base)
+        print(f"📚 {marca}: {len(dfs)} archivos importados")
+
+
+if __name__ == "__main__":
+    importar_csvs()
@@ -0,0 +1,125 @@
+import contextvars
+import itertools
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Métricas de una corrida de scraping: spans (marca, tienda, página, fase) y contadores
+METRICAS_PATH = os.path.join("Data", "Metrics")
+
+# Etiquetas heredadas por todo lo que corre dentro de `etiquetas(...)`, incluidas las tareas
+# de asyncio creadas ahí adentro (cada trabajo marca × supermercado tiene las suyas)
+_etiquetas = contextvars.ContextVar("etiquetas", default={})
+_span_actual = contextvars.ContextVar("span_actual", default=None)
+_ids = itertools.count(1)
+
+spans = []                      # spans terminados, en orden de cierre
+contadores = defaultdict(float)  # (nombre, ((etiqueta, valor), ...)) -> total
+
+
+@contextmanager
+def etiquetas(**valores):
+    token = _etiquetas.set({**_etiquetas.get(), **valores})
+    try:
+        yield
+    finally:
+        _etiquetas.reset(token)
+
+
+@contextmanager
+def span(nombre, **atributos):
+    """Mide un bloque; devuelve un dict donde se pueden agregar atributos (p. ej. productos)"""
+    registro = {"nombre": nombre, "id": next(_ids), "padre": _span_actual.get(),
+                **_etiquetas.get(), **atributos}
+    token = _span_actual.set(registro["id"])
+    registro["inicio"] = time.time()
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as e:
+        registro["error"] = type(e).__name__
+        raise
+    finally:
+        registro["duracion"] = time.perf_counter() - inicio
+        _span_actual.reset(token)
+        spans.append(registro)
+
+
+def contar(nombre, valor=1, **extra):
+    """Suma `valor` al contador `nombre` con las etiquetas actuales más `extra`"""
+    clave = tuple(sorted({**_etiquetas.get(), **extra}.items()))
+    contadores[(nombre, clave)] += valor
+
+
+def contar_fallo(error, **extra):
+    """Cuenta un error como "timeouts" si es un timeout (de Playwright o asyncio) o como "errores" """
+    contar("timeouts" if "Timeout" in type(error).__name__ else "errores", **extra)
+
+
+def reiniciar():
+    spans.clear()
+    contadores.clear()
+
+
+def exportar_jsonl(ruta):
+    """Una línea por span y una por contador"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        for registro in spans:
+            f.write(json.dumps({"tipo": "span", **registro}, ensure_ascii=False, default=str) + "\n")
+        for (nombre, clave), valor in sorted(contadores.items()):
+            f.write(json.dumps({"tipo": "contador", "nombre": nombre, "valor": valor, **dict(clave)},
+                               ensure_ascii=False, default=str) + "\n")
+
+
+def _etiquetas_prometheus(valores):
+    pares = []
+    for clave, valor in sorted(valores.items()):
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{clave}="{valor}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def exportar_prometheus(ruta, prefijo="scraper"):
+    """Formato de texto de Prometheus (para el textfile collector de node_exporter).
+
+    Los spans se resumen por fase, marca y tienda (sin la página, para acotar la cardinalidad).
+    """
+    duraciones = defaultdict(lambda: [0.0, 0])
+    for registro in spans:
+        clave = tuple(sorted([("fase", registro["nombre"])] +
+                             [(k, registro[k]) for k in ("marca", "tienda") if k in registro]))
+        duraciones[clave][0] += registro["duracion"]
+        duraciones[clave][1] += 1
+
+    lineas = [f"# HELP {prefijo}_fase_segundos Tiempo por fase, marca y tienda",
+              f"# TYPE {prefijo}_fase_segundos summary"]
+    for clave, (total, cantidad) in sorted(duraciones.items()):
+        etiquetas_texto = _etiquetas_prometheus(dict(clave))
+        lineas.append(f"{prefijo}_fase_segundos_sum{etiquetas_texto} {total:.6f}")
+        lineas.append(f"{prefijo}_fase_segundos_count{etiquetas_texto} {cantidad}")
+
+    por_nombre = defaultdict(list)
+    for (nombre, clave), valor in sorted(contadores.items()):
+        por_nombre[nombre].append((dict(clave), valor))
+    for nombre, series in por_nombre.items():
+        lineas.append(f"# TYPE {prefijo}_{nombre}_total counter")
+        for valores, valor in series:
+            lineas.append(f"{prefijo}_{nombre}_total{_etiquetas_prometheus(valores)} {valor:g}")
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n")
+
+
+def resumen(top=10):
+    """Imprime las combinaciones tienda × fase que más tiempo sumaron"""
+    totales = defaultdict(float)
+    for registro in spans:
+        if registro["nombre"] in ("corrida", "tienda"):
+            continue
+        totales[(registro.get("tienda", "-"), registro["nombre"])] += registro["duracion"]
+    for (tienda, fase), segundos in sorted(totales.items(), key=lambda x: -x[1])[:top]:
+        print(f"   {str(tienda).capitalize():12} {fase:10}: {segundos:7.1f}s")
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from metrics import contar
+
+# Tope de espera por defecto y período sin cambios que se considera "grilla estable"
+MAX_ESPERA_MS = 10000
+QUIETUD_MS = 500
+
+# Se ejecuta dentro de la página: resuelve cuando la cantidad de productos deja de cambiar
+# y no hubo mutaciones del DOM dentro de la grilla durante `quietud` ms
+JS_GRILLA_ESTABLE = """
+([selector, quietud, limite, minimo, distintoDe]) => new Promise(resolve => {
+    const huella = () => {
+        const nodos = document.querySelectorAll(selector);
+        return nodos.length + "|" + (nodos.length ? nodos[0].textContent.trim().slice(0, 200) : "");
+    };
+    const inicio = performance.now();
+    let ultimoCambio = inicio;
+    let ultimaHuella = huella();
+    const tocaLaGrilla = (nodo) => {
+        const el = nodo && (nodo.nodeType === 1 ? nodo : nodo.parentElement);
+        return !!el && (!!el.closest(selector) || (el.matches && el.matches(selector))
+                        || (!!el.querySelector && !!el.querySelector(selector) && el !== document.body
+                            && el !== document.documentElement));
+    };
+    const observer = new MutationObserver(mutaciones => {
+        for (const m of mutaciones) {
+            if (tocaLaGrilla(m.target) || [...m.addedNodes, ...m.removedNodes].some(tocaLaGrilla)) {
+                ultimoCambio = performance.now();
+                return;
+            }
+        }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    const terminar = (estable) => {
+        observer.disconnect();
+        resolve({estable, conteo: document.querySelectorAll(selector).length, huella: huella()});
+    };
+    const tick = () => {
+        const actual = huella();
+        const ahora = performance.now();
+        if (actual !== ultimaHuella) {
+            ultimaHuella = actual;
+            ultimoCambio = ahora;
+        }
+        const conteo = document.querySelectorAll(selector).length;
+        if (conteo >= minimo && actual !== distintoDe && ahora - ultimoCambio >= quietud) {
+            return terminar(true);
+        }
+        if (ahora - inicio >= limite) {
+            return terminar(false);
+        }
+        setTimeout(tick, 50);
+    };
+    tick();
+})
+"""
+
+
+async def huella_grilla(page, selector):
+    """Firma de la grilla actual (cantidad + primer producto), para detectar el cambio de página"""
+    return await page.evaluate(
+        """(selector) => {
+            const nodos = document.querySelectorAll(selector);
+            return nodos.length + "|" + (nodos.length ? nodos[0].textContent.trim().slice(0, 200) : "");
+        }""",
+        selector,
+    )
+
+
+async def esperar_grilla_estable(page, selector, timeout=MAX_ESPERA_MS, quietud_ms=QUIETUD_MS,
+                                 minimo=1, distinto_de=None):
+    """Espera a que la grilla de productos esté estable, con `timeout` ms como tope.
+
+    Vuelve apenas hay al menos `minimo` productos, su cantidad no cambió y no hubo mutaciones
+    en la grilla durante `quietud_ms`. Con `distinto_de` (ver `huella_grilla`) además espera a
+    que la grilla sea distinta de la anterior, útil después de un click de paginación.
+    Nunca lanza por timeout: devuelve False si se agotó el tope sin estabilizarse.
+    """
+    limite = time.monotonic() + timeout / 1000
+    while True:
+        restante_ms = max(0, (limite - time.monotonic()) * 1000)
+        try:
+            resultado = await page.evaluate(
+                JS_GRILLA_ESTABLE, [selector, quietud_ms, restante_ms, minimo, distinto_de]
+            )
+            if not resultado["estable"]:
+                contar("timeouts", espera="grilla_estable")
+            return resultado["estable"]
+        except Exception as e:
+            # Si la página navega mientras esperamos, se reintenta sobre el documento nuevo
+            if "context was destroyed" not in str(e) and "navigation" not in str(e).lower():
+                raise
+            contar("reintentos", motivo="navegacion")
+            if time.monotonic() >= limite:
+                contar("timeouts", espera="grilla_estable")
+                return False
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=max(1, restante_ms))
+            except Exception:
+                await asyncio.sleep(0.05)
@@ -0,0 +1,203 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from delta_store import DELTAS_PATH, leer_deltas
+from history_store import COLUMNAS_PRECIOS, HISTORY_PATH, leer_historial, normalizar_tipos
+
+# Agregados materializados por marca × producto × supermercado, actualizados día a día
+AGREGADOS_PATH = os.path.join("Data", "Aggregates")
+ARCHIVO_AGREGADOS = "agregados.parquet"
+ARCHIVO_FECHAS = "fechas_aplicadas.parquet"  # (marca, fecha) ya sumadas: hace idempotente la carga
+# Mejores oportunidades de cada marca y fecha, contra el promedio histórico del momento en que se calcularon
+ARCHIVO_OPORTUNIDADES = "oportunidades.parquet"
+TOP_OPORTUNIDADES = 10
+
+CLAVE = ['marca', 'producto_unificado', 'supermercado']
+COLUMNAS_AGREGADOS = CLAVE + ['cantidad', 'suma', 'minimo', 'maximo', 'ultimo_precio', 'ultima_fecha']
+COLUMNAS_OPORTUNIDADES = ['marca', 'fecha', 'producto_unificado', 'min_precio', 'super_min', 'avg_precio',
+                          'ahorro_pct']
+
+
+def agregados_desde(df, marca_col='marca', producto_col='producto_unificado'):
+    """Agregados de un DataFrame ancho (una columna de precio por supermercado)"""
+    supers = [c for c in COLUMNAS_PRECIOS if c in df.columns]
+    df_long = df.melt(
+        id_vars=['fecha', marca_col, producto_col],
+        value_vars=supers,
+        var_name='supermercado',
+        value_name='precio'
+    ).dropna(subset=['precio'])
+    df_long = df_long.rename(columns={marca_col: 'marca', producto_col: 'producto_unificado'})
+    df_long = df_long.sort_values('fecha', kind='stable')
+
+    grupos = df_long.groupby(CLAVE, sort=True)['precio']
+    agregados = pd.DataFrame({
+        'cantidad': grupos.count(),
+        'suma': grupos.sum(),
+        'minimo': grupos.min(),
+        'maximo': grupos.max(),
+        'ultimo_precio': grupos.last(),
+    })
+    agregados['ultima_fecha'] = df_long.groupby(CLAVE, sort=True)['fecha'].max()
+    return _normalizar(agregados.reset_index())
+
+
+def _normalizar(agregados):
+    agregados = agregados[COLUMNAS_AGREGADOS].copy()
+    agregados['cantidad'] = agregados['cantidad'].astype('int64')
+    agregados['ultima_fecha'] = pd.to_datetime(agregados['ultima_fecha'])
+    for col in ['marca', 'producto_unificado', 'supermercado']:
+        agregados[col] = agregados[col].astype('string')
+    return agregados.sort_values(CLAVE, ignore_index=True)
+
+
+def combinar(existentes, nuevos):
+    """Suma dos tablas de agregados de fechas disjuntas"""
+    todos = pd.concat([existentes, nuevos], ignore_index=True).sort_values('ultima_fecha', kind='stable')
+    grupos = todos.groupby(CLAVE, sort=True)
+    combinados = grupos.agg(
+        cantidad=('cantidad', 'sum'),
+        suma=('suma', 'sum'),
+        minimo=('minimo', 'min'),
+        maximo=('maximo', 'max'),
+        ultimo_precio=('ultimo_precio', 'last'),
+        ultima_fecha=('ultima_fecha', 'max'),
+    )
+    return _normalizar(combinados.reset_index())
+
+
+def leer_agregados(base=AGREGADOS_PATH):
+    ruta = os.path.join(base, ARCHIVO_AGREGADOS)
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=COLUMNAS_AGREGADOS)
+    return pd.read_parquet(ruta)
+
+
+def leer_fechas_aplicadas(base=AGREGADOS_PATH):
+    ruta = os.path.join(base, ARCHIVO_FECHAS)
+    if not os.path.exists(ruta):
+        return pd.DataFrame({'marca': pd.Series(dtype='string'), 'fecha': pd.Series(dtype='datetime64[ns]')})
+    return pd.read_parquet(ruta)
+
+
+def _guardar(agregados, fechas, base):
+    os.makedirs(base, exist_ok=True)
+    agregados.to_parquet(os.path.join(base, ARCHIVO_AGREGADOS), index=False)
+    fechas = fechas.drop_duplicates().sort_values(['marca', 'fecha'], ignore_index=True)
+    fechas['marca'] = fechas['marca'].astype('string')
+    fechas.to_parquet(os.path.join(base, ARCHIVO_FECHAS), index=False)
+
+
+def reconstruir_marca(marca, base=AGREGADOS_PATH, history_base=HISTORY_PATH, leer=leer_historial):
+    """Recalcula desde el histórico los agregados de una marca (p. ej. al reprocesar un día).
+
+    `leer` lee los snapshots de la marca desde `history_base` (`delta_store.leer_deltas` en modo deltas).
+    """
+    historial = leer(marcas=[marca], base=history_base)
+    agregados = leer_agregados(base)
+    fechas = leer_fechas_aplicadas(base)
+    agregados = agregados[agregados['marca'] != marca]
+    fechas = fechas[fechas['marca'] != marca]
+    if len(historial):
+        agregados = pd.concat([agregados, agregados_desde(historial)], ignore_index=True)
+        fechas_marca = pd.DataFrame({'marca': marca, 'fecha': historial['fecha'].unique()})
+        fechas = pd.concat([fechas, fechas_marca], ignore_index=True)
+    _guardar(_normalizar(agregados), fechas, base)
+
+
+def actualizar(df_unificado, marca, base=AGREGADOS_PATH, history_base=HISTORY_PATH, leer=leer_historial):
+    """Suma los días de `df_unificado` a los agregados de la marca.
+
+    Las fechas nuevas se suman sin leer el histórico; si alguna ya estaba aplicada (reproceso),
+    la marca se recalcula desde el histórico (o los cambios, con `leer`), que ya debe tener el día actualizado.
+    """
+    df_nuevo = normalizar_tipos(df_unificado)
+    df_nuevo['marca'] = marca
+    fechas = leer_fechas_aplicadas(base)
+    aplicadas = set(fechas.loc[fechas['marca'] == marca, 'fecha'])
+    if aplicadas & set(df_nuevo['fecha'].unique()):
+        reconstruir_marca(marca, base, history_base, leer)
+    else:
+        agregados = combinar(leer_agregados(base), agregados_desde(df_nuevo))
+        fechas_nuevas = pd.DataFrame({'marca': marca, 'fecha': df_nuevo['fecha'].unique()})
+        _guardar(agregados, pd.concat([fechas, fechas_nuevas], ignore_index=True), base)
+    _guardar_oportunidades(df_nuevo, base)
+
+
+def promedio_historico(agregados, marcas=None):
+    """Precio promedio de cada producto sobre todos sus días y supermercados"""
+    if marcas is not None:
+        agregados = agregados[agregados['marca'].isin(marcas)]
+    totales = agregados.groupby('producto_unificado')[['suma', 'cantidad']].sum()
+    return (totales['suma'] / totales['cantidad']).rename('avg_precio')
+
+
+def precio_minimo(df, supers=COLUMNAS_PRECIOS):
+    """(mínimo, supermercado del mínimo) por fila; NaN y None si la fila no tiene precios"""
+    supers = [c for c in supers if c in df.columns]
+    precios = df[supers].to_numpy(dtype='float64')
+    sin_precios = np.isnan(precios).all(axis=1)
+    posicion = np.argmin(np.where(np.isnan(precios), np.inf, precios), axis=1)
+    minimo = np.where(sin_precios, np.nan, precios[np.arange(len(precios)), posicion])
+    super_min = np.where(sin_precios, None, np.asarray(supers, dtype=object)[posicion])
+    return minimo, super_min
+
+
+def oportunidades_desde(df_dia, avg_hist, n=TOP_OPORTUNIDADES):
+    """Las `n` filas de mayor ahorro del mínimo actual contra el promedio histórico, por marca y fecha"""
+    df = df_dia[['marca', 'fecha', 'producto_unificado']].copy()
+    df['min_precio'], df['super_min'] = precio_minimo(df_dia)
+    df['avg_precio'] = df['producto_unificado'].map(avg_hist)
+    df = df.dropna(subset=['avg_precio', 'min_precio'])
+    df['ahorro_pct'] = 1 - df['min_precio'] / df['avg_precio']
+    df = df.sort_values('ahorro_pct', ascending=False, kind='stable')
+    return df.groupby(['marca', 'fecha'], sort=False).head(n)[COLUMNAS_OPORTUNIDADES].reset_index(drop=True)
+
+
+def leer_oportunidades(base=AGREGADOS_PATH):
+    ruta = os.path.join(base, ARCHIVO_OPORTUNIDADES)
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=COLUMNAS_OPORTUNIDADES)
+    return pd.read_parquet(ruta)
+
+
+def _guardar_oportunidades(df_nuevo, base):
+    """Reemplaza en la tabla las (marca, fecha) de `df_nuevo` por sus oportunidades actuales"""
+    agregados = leer_agregados(base)
+    nuevas = oportunidades_desde(df_nuevo, promedio_historico(agregados, marcas=df_nuevo['marca'].unique()))
+    existentes = leer_oportunidades(base)
+    claves = pd.MultiIndex.from_frame(df_nuevo[['marca', 'fecha']].drop_duplicates())
+    existentes = existentes[~pd.MultiIndex.from_frame(existentes[['marca', 'fecha']]).isin(claves)]
+    tabla = pd.concat([existentes, nuevas], ignore_index=True)
+    tabla = tabla.sort_values(['marca', 'fecha', 'ahorro_pct'], ascending=[True, True, False], kind='stable',
+                              ignore_index=True)
+    tabla['marca'] = tabla['marca'].astype('string')
+    tabla['producto_unificado'] = tabla['producto_unificado'].astype('string')
+    tabla['fecha'] = pd.to_datetime(tabla['fecha'])
+    os.makedirs(base, exist_ok=True)
+    tabla.to_parquet(os.path.join(base, ARCHIVO_OPORTUNIDADES), index=False)
+
+
+def reconstruir(base=AGREGADOS_PATH, history_base=HISTORY_PATH, leer=leer_historial):
+    """Recalcula todos los agregados desde el histórico o, con `leer`, desde los cambios (migración o reparación)"""
+    historial = leer(base=history_base)
+    fechas = historial[['marca', 'fecha']].drop_duplicates()
+    _guardar(agregados_desde(historial), fechas, base)
+    if os.path.exists(os.path.join(base, ARCHIVO_OPORTUNIDADES)):
+        os.remove(os.path.join(base, ARCHIVO_OPORTUNIDADES))
+    _guardar_oportunidades(historial, base)
+    print(f"📊 Agregados reconstruidos: {historial['marca'].nunique()} marcas, {len(fechas)} días")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula los agregados de precios desde cero")
+    parser.add_argument("--fuente", choices=["deltas", "historial"], default="deltas",
+                        help="Data/Deltas (modo por defecto de la unificación) o el histórico Parquet")
+    args = parser.parse_args()
+    if args.fuente == "deltas":
+        reconstruir(history_base=DELTAS_PATH, leer=leer_deltas)
+    else:
+        reconstruir()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from fuzzywuzzy import fuzz
+
+# Accepted matches (and rejections) per brand, so each raw name is scored only once
+MATCH_CACHE_PATH = os.path.join("Data", "match_cache.json")
+
+MATCH_THRESHOLD = 90   # fuzz.token_sort_ratio over normalized names
+MAX_CANDIDATES = 10    # canonical names scored per raw name, chosen by the blocking index
+
+# Brand tokens carry no information inside a brand's catalog
+BRAND_TOKENS = {
+    'not': ['the not co', 'notco', 'not co'],
+    'felices_las_vacas': ['felices las vacas', 'felices'],
+    'vegetalex': ['vegetalex'],
+}
+
+STOPWORDS = {
+    'a', 'al', 'de', 'del', 'el', 'en', 'la', 'las', 'los', 'y', 'con', 'para', 'tipo', 'sabor',
+    'base', 'alimento', 'producto', 'plantas', 'plant', 'based', 'vegetal',
+}
+
+UNIT_TO_GRAMS = {'kg': 1000, 'kgs': 1000, 'kilo': 1000, 'kilos': 1000,
+                 'g': 1, 'gr': 1, 'grs': 1, 'gramo': 1, 'gramos': 1}
+UNIT_TO_ML = {'l': 1000, 'lt': 1000, 'lts': 1000, 'litro': 1000, 'litros': 1000, 'ml': 1, 'cc': 1}
+
+# "0.24kgs", "210 Gr.", "125 g.", "1,5 l"
+QUANTITY_RE = re.compile(
+    r'(\d+(?:[.,]\d+)?)\s*(kgs?|kilos?|grs?|gramos?|gr|g|ml|cc|lts?|litros?|l)\b\.?')
+# "x2", "X 2 U", "2 uni", "4 unidades"
+PACK_RE = re.compile(r'\bx\s*(\d+)\s*(?:u|un|uni|unid|unidades)?\b|\b(\d+)\s*(?:u|un|uni|unid|unidades)\b')
+# "NotChicken", "Notcheese" -> "not chicken"
+GLUED_NOT_RE = re.compile(r'\bnot(?=(chicken|chiken|cheese|meat|mayo|milk|burger|protein|icecream|cream)\b)')
+
+
+def strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def _quantity(match):
+    amount = float(match.group(1).replace(',', '.'))
+    unit = match.group(2)
+    if unit in UNIT_TO_GRAMS:
+        return f" {round(amount * UNIT_TO_GRAMS[unit])}g "
+    return f" {round(amount * UNIT_TO_ML[unit])}ml "
+
+
+def _stem(token):
+    # Crude plural folding: "quesos" -> "queso", "fetas" -> "feta"
+    if len(token) > 3 and token.endswith('s') and not token[-2].isdigit():
+        return token[:-1]
+    return token
+
+
+def normalize_name(name, brand=None):
+    """Lowercase, accent-free name with canonical units ("240g", "x2") and no brand tokens"""
+    text = strip_accents(str(name)).lower()
+    text = GLUED_NOT_RE.sub('not ', text)
+    text = QUANTITY_RE.sub(_quantity, text)
+    text = PACK_RE.sub(lambda m: f" x{m.group(1) or m.group(2)} ", text)
+    for token in BRAND_TOKENS.get(brand, []):
+        text = re.sub(rf'\b{re.escape(token)}\b', ' ', text)
+    text = re.sub(r'[^\w]+', ' ', text)
+    tokens = [_stem(t) for t in text.split() if t not in STOPWORDS]
+    return ' '.join(tokens)
+
+
+def _blocking_keys(normalized):
+    keys = set()
+    for token in normalized.split():
+        keys.add(token)
+        padded = f"#{token}#"
+        keys.update('~' + padded[i:i + 3] for i in range(len(padded) - 2))
+    return keys
+
+
+def _sizes(normalized):
+    """Weight/volume and pack tokens, which must agree for two names to be the same product"""
+    tokens = normalized.split()
+    quantities = {t for t in tokens if re.fullmatch(r'\d+(g|ml)', t)}
+    packs = {t for t in tokens if re.fullmatch(r'x\d+', t)}
+    return quantities, packs
+
+
+def _content_tokens(normalized):
+    return {t for t in normalized.split() if not re.fullmatch(r'\d+(g|ml)|x\d+|\d+', t)}
+
+
+class ProductMatcher:
+    """Resolves raw product names to canonical names: exact map first, then an indexed fuzzy match"""
+
+    def __init__(self, brand, unification_map, cache_path=MATCH_CACHE_PATH, threshold=MATCH_THRESHOLD):
+        self.brand = brand
+        self.threshold = threshold
+        self.cache_path = cache_path
+        self.reverse_map = build_reverse_map(unification_map)
+        for canonical_name in unification_map:
+            self.reverse_map.setdefault(canonical_name, canonical_name)
+
+        # Every known spelling (canonical and variants) is indexed and points to its canonical name
+        self._entries = []  # (normalized, canonical)
+        self._index = defaultdict(set)
+        group_tokens = defaultdict(set)
+        for spelling, canonical_name in self.reverse_map.items():
+            normalized = normalize_name(spelling, brand)
+            entry_id = len(self._entries)
+            self._entries.append((normalized, canonical_name))
+            group_tokens[canonical_name].update(_content_tokens(normalized))
+            for key in _blocking_keys(normalized):
+                self._index[key].add(entry_id)
+
+        # Tokens used by a single canonical product ("xl", "reggianito") tell products apart
+        groups_per_token = Counter(t for tokens in group_tokens.values() for t in tokens)
+        self._owner = {t: canonical_name for canonical_name, tokens in group_tokens.items()
+                       for t in tokens if groups_per_token[t] == 1}
+
+        self._version = hashlib.sha1('\n'.join(sorted(unification_map)).encode('utf-8')).hexdigest()[:12]
+        self.cache = {}
+        self.new_matches = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, encoding='utf-8') as f:
+            stored = json.load(f).get(self.brand, {})
+        canonical_names = set(self.reverse_map.values())
+        for raw_name, canonical_name in stored.get('matches', {}).items():
+            if canonical_name is None:
+                # Rejections are only valid for the canonical list they were scored against
+                if stored.get('version') == self._version:
+                    self.cache[raw_name] = None
+            elif canonical_name in canonical_names:
+                self.cache[raw_name] = canonical_name
+
+    def _candidates(self, normalized):
+        counts = Counter()
+        for key in _blocking_keys(normalized):
+            for entry_id in self._index.get(key, ()):
+                counts[entry_id] += 1
+        best_by_canonical = {}
+        for entry_id, shared in counts.most_common():
+            canonical_name = self._entries[entry_id][1]
+            if canonical_name not in best_by_canonical:
+                best_by_canonical[canonical_name] = []
+            best_by_canonical[canonical_name].append(entry_id)
+            if len(best_by_canonical) > MAX_CANDIDATES:
+                break
+        return [entry_id for ids in best_by_canonical.values() for entry_id in ids]
+
+    def score(self, raw_name):
+        """Best (canonical_name, score) among the blocked candidates, or (None, 0)"""
+        normalized = normalize_name(raw_name, self.brand)
+        quantities, packs = _sizes(normalized)
+        tokens = _content_tokens(normalized)
+        owners = {self._owner[t] for t in tokens if t in self._owner}
+        best, best_score = None, 0
+        for entry_id in self._candidates(normalized):
+            candidate, canonical_name = self._entries[entry_id]
+            candidate_quantities, candidate_packs = _sizes(candidate)
+            if quantities and candidate_quantities and not quantities & candidate_quantities:
+                continue
+            if packs and candidate_packs and packs != candidate_packs:
+                continue
+            # The raw name mentions another product's distinctive token, or lacks one of this spelling's
+            if owners - {canonical_name}:
+                continue
+            if any(self._owner.get(t) == canonical_name for t in _content_tokens(candidate) - tokens):
+                continue
+            score = fuzz.token_sort_ratio(normalized, candidate)
+            if score > best_score:
+                best, best_score = canonical_name, score
+        return best, best_score
+
+    def resolve(self, raw_name):
+        """Canonical name for `raw_name`, or `raw_name` itself if nothing matches"""
+        canonical_name = self.reverse_map.get(raw_name)
+        if canonical_name is not None:
+            return canonical_name
+        if raw_name in self.cache:
+            return self.cache[raw_name] or raw_name
+        best, best_score = self.score(raw_name)
+        accepted = best if best_score >= self.threshold else None
+        self.cache[raw_name] = accepted
+        self.new_matches[raw_name] = accepted
+        return accepted or raw_name
+
+    def resolve_many(self, raw_names):
+        """{raw_name: canonical_name} for the unique names in `raw_names`"""
+        return {raw_name: self.resolve(raw_name) for raw_name in set(raw_names) if isinstance(raw_name, str)}
+
+    def merge(self, matches):
+        """Adds matches resolved elsewhere (e.g. by a worker process's copy of this matcher)"""
+        for raw_name, canonical_name in matches.items():
+            if raw_name not in self.cache:
+                self.cache[raw_name] = canonical_name
+                self.new_matches[raw_name] = canonical_name
+
+    def save(self):
+        """Persists the cache for this brand, merged with the other brands already on disk"""
+        if not self.cache_path or not self.new_matches:
+            return
+        stored = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, encoding='utf-8') as f:
+                stored = json.load(f)
+        stored[self.brand] = {'version': self._version, 'matches': dict(sorted(self.cache.items()))}
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False, indent=1, sort_keys=True)
+        self.new_matches = {}
+
+
+def build_reverse_map(unification_map):
+    """{variant: canonical_name} from {canonical_name: [variants]}"""
+    reverse_unification_map = {}
+    for canonical_name, variants in unification_map.items():
+        for variant in variants:
+            reverse_unification_map[variant] = canonical_name
+    return reverse_unification_map
@@ -0,0 +1,173 @@
+import argparse
+import glob
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+
+# Archivo compacto de los CSV crudos ya procesados (Data/Used), un zip por marca y mes:
+#   Data/Archive/marca=not/mes=2025-07.zip   precios_async_2025-07-01_not.csv, ...
+#   Data/Archive/indice.csv                  fecha, marca, segmento, miembro, bytes, comprimido
+# Cada CSV es un miembro comprimido por separado, así una consulta descomprime sólo los días que
+# pide. Se archivan sólo meses cerrados: cada segmento se escribe una vez y no cambia en cada corrida.
+ARCHIVE_PATH = os.path.join("Data", "Archive")
+USED_PATH = os.path.join("Data", "Used")
+ARCHIVO_INDICE = "indice.csv"
+
+COLUMNAS_INDICE = ['fecha', 'marca', 'segmento', 'miembro', 'bytes', 'comprimido']
+PATRON_RAW = re.compile(r'precios_async_(\d{4}-\d{2}-\d{2})_(\w+)\.csv')
+
+
+def ruta_segmento(marca, mes, base=ARCHIVE_PATH):
+    return os.path.join(base, f"marca={marca}", f"mes={mes}.zip")
+
+
+def _escribir_segmento(ruta, miembros):
+    """Reescribe el zip con `miembros` ({nombre: bytes}) en orden y con fechas fijas (zip reproducible)"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + ".tmp"
+    with zipfile.ZipFile(temporal, "w") as zf:
+        for nombre in sorted(miembros):
+            fecha = datetime.strptime(PATRON_RAW.match(nombre).group(1), "%Y-%m-%d")
+            info = zipfile.ZipInfo(nombre, date_time=fecha.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, miembros[nombre], compresslevel=9)
+    os.replace(temporal, ruta)
+
+
+def reconstruir_indice(base=ARCHIVE_PATH):
+    """Arma el índice leyendo sólo el directorio central de cada zip (sin descomprimir nada)"""
+    filas = []
+    for ruta in sorted(glob.glob(os.path.join(base, "marca=*", "mes=*.zip"))):
+        with zipfile.ZipFile(ruta) as zf:
+            for info in zf.infolist():
+                match = PATRON_RAW.match(info.filename)
+                if not match:
+                    continue
+                filas.append({'fecha': match.group(1), 'marca': match.group(2),
+                              'segmento': os.path.relpath(ruta, base).replace(os.sep, "/"),
+                              'miembro': info.filename, 'bytes': info.file_size, 'comprimido': info.compress_size})
+    indice = pd.DataFrame(filas, columns=COLUMNAS_INDICE).sort_values(['fecha', 'marca'], ignore_index=True)
+    os.makedirs(base, exist_ok=True)
+    indice.to_csv(os.path.join(base, ARCHIVO_INDICE), index=False)
+    return indice
+
+
+def leer_indice(base=ARCHIVE_PATH):
+    ruta = os.path.join(base, ARCHIVO_INDICE)
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=COLUMNAS_INDICE)
+    return pd.read_csv(ruta, dtype={'fecha': str, 'marca': str})
+
+
+def archivar(used_directory=USED_PATH, base=ARCHIVE_PATH, hasta_mes=None, borrar=True):
+    """Pasa a los segmentos los CSV crudos de Data/Used de meses anteriores a `hasta_mes`
+    (por defecto, el mes actual) y los borra de Data/Used"""
+    hasta_mes = hasta_mes or datetime.now().strftime("%Y-%m")
+    por_segmento = {}
+    for ruta in sorted(glob.glob(os.path.join(used_directory, "precios_async_*.csv"))):
+        match = PATRON_RAW.match(os.path.basename(ruta))
+        if not match or match.group(1)[:7] >= hasta_mes:
+            continue
+        por_segmento.setdefault((match.group(2), match.group(1)[:7]), []).append(ruta)
+
+    for (marca, mes), rutas in sorted(por_segmento.items()):
+        segmento = ruta_segmento(marca, mes, base)
+        miembros = {}
+        if os.path.exists(segmento):
+            with zipfile.ZipFile(segmento) as zf:
+                miembros = {nombre: zf.read(nombre) for nombre in zf.namelist()}
+        for ruta in rutas:
+            with open(ruta, "rb") as f:
+                miembros[os.path.basename(ruta)] = f.read()  # Un día reprocesado reemplaza al archivado
+        _escribir_segmento(segmento, miembros)
+        print(f"🗜️ {marca} {mes}: {len(rutas)} días -> {segmento}")
+        if borrar:
+            for ruta in rutas:
+                os.remove(ruta)
+
+    if por_segmento:
+        reconstruir_indice(base)
+    return sum(len(rutas) for rutas in por_segmento.values())
+
+
+def _leer_miembros(filas, base, columnas):
+    """[(marca, DataFrame)] de los miembros del índice en `filas`, abriendo cada segmento una sola vez"""
+    dfs = []
+    for segmento, grupo in filas.groupby('segmento', sort=True):
+        with zipfile.ZipFile(os.path.join(base, segmento)) as zf:
+            for marca, miembro in zip(grupo['marca'], grupo['miembro']):
+                with zf.open(miembro) as f:
+                    dfs.append((marca, pd.read_csv(io.BytesIO(f.read()), usecols=columnas)))
+    return dfs
+
+
+def _columnas(tiendas):
+    if tiendas is None:
+        return None
+    return lambda col: col in ('fecha', 'producto') or col in tiendas
+
+
+def leer_crudo(marca, fecha, tienda=None, base=ARCHIVE_PATH, used_directory=USED_PATH):
+    """Tabla cruda de una marca y un día ("precios de Coto para not el 2025-07-20" con tienda="coto").
+
+    Con `tienda`, sólo los productos con precio en ese supermercado. Busca en el archivo y, si el
+    día todavía no se archivó, en Data/Used. None si no existe.
+    """
+    fecha = pd.Timestamp(fecha).strftime("%Y-%m-%d")
+    tiendas = None if tienda is None else [tienda]
+    indice = leer_indice(base)
+    filas = indice[(indice['marca'] == marca) & (indice['fecha'] == fecha)]
+    if len(filas):
+        _, df = _leer_miembros(filas, base, _columnas(tiendas))[0]
+    else:
+        ruta = os.path.join(used_directory, f"precios_async_{fecha}_{marca}.csv")
+        if not os.path.exists(ruta):
+            return None
+        df = pd.read_csv(ruta, usecols=_columnas(tiendas))
+    if tienda is not None:
+        df = df[df[tienda].notna()].reset_index(drop=True)
+    return df
+
+
+def leer_rango(marcas=None, desde=None, hasta=None, tiendas=None, base=ARCHIVE_PATH, used_directory=USED_PATH):
+    """Tablas crudas de los días entre `desde` y `hasta` (inclusive), concatenadas y con columna marca.
+
+    Sólo se descomprimen los miembros del rango; los días sin archivar se leen de Data/Used.
+    """
+    desde = None if desde is None else pd.Timestamp(desde).strftime("%Y-%m-%d")
+    hasta = None if hasta is None else pd.Timestamp(hasta).strftime("%Y-%m-%d")
+
+    def en_rango(fecha, marca):
+        return ((marcas is None or marca in marcas) and (desde is None or fecha >= desde)
+                and (hasta is None or fecha <= hasta))
+
+    indice = leer_indice(base)
+    filas = indice[[en_rango(f, m) for f, m in zip(indice['fecha'], indice['marca'])]]
+    dfs = [df.assign(marca=marca) for marca, df in _leer_miembros(filas, base, _columnas(tiendas))]
+
+    archivados = set(zip(filas['fecha'], filas['marca']))
+    for ruta in sorted(glob.glob(os.path.join(used_directory, "precios_async_*.csv"))):
+        match = PATRON_RAW.match(os.path.basename(ruta))
+        if match and en_rango(*match.groups()) and match.groups() not in archivados:
+            dfs.append(pd.read_csv(ruta, usecols=_columnas(tiendas)).assign(marca=match.group(2)))
+
+    if not dfs:
+        return pd.DataFrame(columns=['fecha', 'producto'] + list(tiendas or []) + ['marca'])
+    return pd.concat(dfs, ignore_index=True).sort_values(['fecha', 'marca'], kind='stable', ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compacta los CSV crudos de Data/Used en segmentos zip por marca y mes")
+    parser.add_argument("--hasta-mes", help="Archivar los meses anteriores a este (AAAA-MM; por defecto, el actual)")
+    parser.add_argument("--conservar", action="store_true", help="No borrar de Data/Used los CSV archivados")
+    args = parser.parse_args(argv)
+    archivados = archivar(hasta_mes=args.hasta_mes, borrar=not args.conservar)
+    print(f"✅ {archivados} CSV crudos archivados en {ARCHIVE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
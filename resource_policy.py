@@ -0,0 +1,92 @@
+from urllib.parse import urlparse
+
+from metrics import contar
+
+# Tipos de recurso que nunca hacen falta para leer nombres y precios
+TIPOS_BLOQUEADOS = {"image", "font", "media"}
+
+# Analytics y publicidad: se bloquean aunque estén en una lista permitida
+DOMINIOS_TRACKERS = {
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "googlesyndication.com",
+    "doubleclick.net", "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "bing.com",
+    "tiktok.com", "criteo.com", "criteo.net", "taboola.com", "adnxs.com", "onesignal.com",
+    "newrelic.com", "nr-data.net", "segment.io", "optimizely.com", "yotpo.com", "rtbhouse.com",
+}
+
+# Dominios de terceros que cada sitio necesita para renderizar la grilla con precios.
+# El dominio propio de la tienda siempre está permitido.
+DOMINIOS_VTEX = ["vtexassets.com", "vteximg.com.br", "vtex.com.br", "vtexcommercestable.com.br", "vtex.com"]
+POLITICAS = {
+    "carrefour": {"dominio": "carrefour.com.ar", "dominios_permitidos": DOMINIOS_VTEX, "tipos_permitidos": []},
+    "coope": {"dominio": "lacoopeencasa.coop", "dominios_permitidos": [], "tipos_permitidos": []},
+    "coto": {"dominio": "cotodigital.com.ar", "dominios_permitidos": ["cotodigital3.com.ar"], "tipos_permitidos": []},
+    "dia": {"dominio": "supermercadosdia.com.ar", "dominios_permitidos": DOMINIOS_VTEX, "tipos_permitidos": []},
+    "disco": {"dominio": "disco.com.ar", "dominios_permitidos": DOMINIOS_VTEX, "tipos_permitidos": []},
+    "vea": {"dominio": "vea.com.ar", "dominios_permitidos": DOMINIOS_VTEX, "tipos_permitidos": []},
+}
+
+# Tamaño típico de lo que se deja de descargar, para estimar el ahorro (bytes)
+TAMANIO_ESTIMADO = {"image": 40_000, "font": 60_000, "media": 500_000, "script": 50_000}
+TAMANIO_ESTIMADO_OTROS = 5_000
+
+
+def _coincide(host, dominio):
+    return host == dominio or host.endswith("." + dominio)
+
+
+def motivo_bloqueo(tienda, tipo, url):
+    """Devuelve por qué se bloquea un pedido ("tipo", "tracker", "tercero") o None si se deja pasar"""
+    politica = POLITICAS.get(tienda)
+    host = urlparse(url).hostname or ""
+    if not host:
+        return None  # data:, blob:, about:
+    if any(_coincide(host, d) for d in DOMINIOS_TRACKERS):
+        return "tracker"
+    if politica is None:
+        return "tipo" if tipo in TIPOS_BLOQUEADOS else None
+    if tipo in TIPOS_BLOQUEADOS and tipo not in politica["tipos_permitidos"]:
+        return "tipo"
+    permitidos = [politica["dominio"], *politica["dominios_permitidos"]]
+    if not any(_coincide(host, d) for d in permitidos):
+        return "tercero"
+    return None
+
+
+def estadisticas_vacias():
+    return {"permitidos": 0, "bloqueados": 0, "por_motivo": {}, "bytes_recibidos": 0,
+            "bytes_ahorrados_estimados": 0}
+
+
+async def aplicar_politica(context, tienda, estadisticas):
+    """Intercepta todos los pedidos del contexto y acumula los contadores en `estadisticas`"""
+
+    async def manejar(route):
+        request = route.request
+        motivo = motivo_bloqueo(tienda, request.resource_type, request.url)
+        if motivo is None:
+            estadisticas["permitidos"] += 1
+            await route.continue_()
+            return
+        estadisticas["bloqueados"] += 1
+        estadisticas["por_motivo"][motivo] = estadisticas["por_motivo"].get(motivo, 0) + 1
+        estadisticas["bytes_ahorrados_estimados"] += TAMANIO_ESTIMADO.get(request.resource_type, TAMANIO_ESTIMADO_OTROS)
+        contar("pedidos_bloqueados", tienda=tienda, motivo=motivo)
+        await route.abort("blockedbyclient")
+
+    def al_responder(response):
+        largo = response.headers.get("content-length")
+        if largo and largo.isdigit():
+            estadisticas["bytes_recibidos"] += int(largo)
+            contar("bytes_recibidos", int(largo), tienda=tienda)
+
+    await context.route("**/*", manejar)
+    context.on("response", al_responder)
+
+
+def resumen(estadisticas_por_tienda):
+    """Imprime lo bloqueado y lo descargado por supermercado"""
+    for tienda, e in sorted(estadisticas_por_tienda.items()):
+        motivos = ", ".join(f"{m}: {n}" for m, n in sorted(e["por_motivo"].items())) or "-"
+        print(f"   {tienda.capitalize():12}: {e['bloqueados']:4d} bloqueados ({motivos}), "
+              f"{e['bytes_recibidos'] / 1e6:.1f} MB descargados, "
+              f"~{e['bytes_ahorrados_estimados'] / 1e6:.1f} MB ahorrados")
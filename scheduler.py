@@ -0,0 +1,112 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+# Límites por defecto del planificador
+MAX_CONCURRENCIA = 8   # trabajos simultáneos en total
+MAX_POR_HOST = 2       # trabajos simultáneos contra un mismo sitio
+PAUSA_POR_HOST = 1.0   # segundos mínimos entre dos arranques contra el mismo sitio
+PRESUPUESTO_POR_TRABAJO = 240   # segundos máximos de un trabajo desde que arranca
+PRESUPUESTO_TOTAL = 20 * 60     # segundos máximos de toda la corrida
+
+# Excepciones por sitio: host -> (max_concurrencia, pausa_segundos)
+LIMITES_POR_HOST = {}
+
+
+def host_de(url):
+    return urlparse(url).netloc or url
+
+
+def crear_trabajo(marca, tienda, host, fabrica, parciales=None):
+    """Un trabajo marca × supermercado; `fabrica` es una función sin argumentos que devuelve la corutina.
+
+    `parciales` es la lista donde la corutina va acumulando productos: si se agota el presupuesto,
+    el trabajo se cancela y se devuelve lo que haya en ella.
+    """
+    return {"marca": marca, "tienda": tienda, "host": host, "fabrica": fabrica,
+            "parciales": [] if parciales is None else parciales}
+
+
+class _Host:
+    """Semáforo y pausa de cortesía de un sitio"""
+
+    def __init__(self, max_concurrencia, pausa):
+        self.semaforo = asyncio.Semaphore(max_concurrencia)
+        self.pausa = pausa
+        self.lock = asyncio.Lock()
+        self.ultimo_arranque = None
+
+    async def esperar_turno(self):
+        async with self.lock:
+            if self.ultimo_arranque is not None:
+                espera = self.ultimo_arranque + self.pausa - time.monotonic()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            self.ultimo_arranque = time.monotonic()
+
+
+async def ejecutar_trabajos(trabajos, max_concurrencia=MAX_CONCURRENCIA, max_por_host=MAX_POR_HOST,
+                            pausa_por_host=PAUSA_POR_HOST, limites_por_host=None,
+                            presupuesto_por_trabajo=None, presupuesto_total=None, al_terminar=None):
+    """Ejecuta todos los trabajos en paralelo respetando el tope global y los límites por sitio.
+
+    Devuelve un registro por trabajo, en el mismo orden de `trabajos`, con la marca, la tienda,
+    los productos obtenidos (lista vacía si falló), la excepción si la hubo, la duración y el
+    estado: "completo", "parcial" (se agotó el presupuesto y quedan los productos acumulados),
+    "error" o "sin_tiempo" (la corrida se quedó sin presupuesto antes de que arrancara).
+    Si se pasa `al_terminar`, se llama con cada registro apenas termina su trabajo.
+    """
+    limites_por_host = LIMITES_POR_HOST if limites_por_host is None else limites_por_host
+    limite_total = None if presupuesto_total is None else time.monotonic() + presupuesto_total
+    global_semaforo = asyncio.Semaphore(max_concurrencia)
+    hosts = {}
+
+    def host_para(nombre):
+        if nombre not in hosts:
+            max_host, pausa = limites_por_host.get(nombre, (max_por_host, pausa_por_host))
+            hosts[nombre] = _Host(max_host, pausa)
+        return hosts[nombre]
+
+    async def correr(trabajo):
+        registro = await correr_trabajo(trabajo)
+        if al_terminar is not None:
+            al_terminar(registro)
+        return registro
+
+    async def correr_trabajo(trabajo):
+        host = host_para(trabajo["host"])
+        registro = {
+            "marca": trabajo["marca"],
+            "tienda": trabajo["tienda"],
+            "host": trabajo["host"],
+            "productos": [],
+            "error": None,
+            "inicio": None,
+            "duracion": None,
+            "estado": "completo",
+        }
+        async with host.semaforo:
+            async with global_semaforo:
+                await host.esperar_turno()
+                plazos = [presupuesto_por_trabajo]
+                if limite_total is not None:
+                    plazos.append(limite_total - time.monotonic())
+                plazo = min((p for p in plazos if p is not None), default=None)
+                if plazo is not None and plazo <= 0:
+                    registro["estado"] = "sin_tiempo"
+                    return registro
+                inicio = time.monotonic()
+                registro["inicio"] = time.time()
+                try:
+                    resultado = await asyncio.wait_for(trabajo["fabrica"](), plazo)
+                    registro["productos"] = resultado or []
+                except asyncio.TimeoutError:
+                    registro["productos"] = list(trabajo.get("parciales") or [])
+                    registro["estado"] = "parcial"
+                except Exception as e:
+                    registro["error"] = e
+                    registro["estado"] = "error"
+                registro["duracion"] = time.monotonic() - inicio
+        return registro
+
+    return await asyncio.gather(*(correr(t) for t in trabajos))
@@ -1,94 +1,147 @@
+import argparse
 import asyncio
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import sys
 import time
 import os
 
+from browser_pool import BrowserPool
+from metrics import METRICAS_PATH, contar, contar_fallo, etiquetas, exportar_jsonl, exportar_prometheus, span
+from metrics import resumen as resumen_metricas
+from resource_policy import resumen as resumen_recursos
 from scrape_carrefour_async import scrape_carrefour_marca
 from scrape_coope_async import scrape_coope
 from scrape_coto_async import scrape_coto_all_pages
 from scrape_dia_async import scrape_dia
 from scrape_disco_async import scrape_disco
 from scrape_vea_async import scrape_vea_all_pages
+from unify_product_names import (CLEANED_DATA_PATH, EXPORT_CLEANED_CSV, PRODUCT_COLUMN, RAW_DATA_PATH, STORAGE_MODE,
+                                  SUPERMARKET_COLUMNS, UNIFICATION_MAPS, USED_DATA_PATH, aggregate_unified,
+                                  export_unified, parse_price_series, store_unified)
+from product_matcher import ProductMatcher
+from scheduler import (crear_trabajo, ejecutar_trabajos, host_de, MAX_CONCURRENCIA, MAX_POR_HOST, PAUSA_POR_HOST,
+                       PRESUPUESTO_POR_TRABAJO, PRESUPUESTO_TOTAL)
+from vtex_search import TIENDAS_VTEX, buscar_vtex_con_fallback, capturar_vtex
 
-async def scrape_otros_5(marca_a_buscar):
-    """Ejecuta scraping en paralelo para 5 supermercados"""
-    resultados = await asyncio.gather(
-        scrape_coope(marca_a_buscar),
-        scrape_coto_all_pages(marca_a_buscar),
-        scrape_dia(marca_a_buscar),
-        scrape_disco(marca_a_buscar),
-        scrape_vea_all_pages(marca_a_buscar),
-        return_exceptions=True
-    )
-    return resultados
-
-async def scrape_all(marca_a_buscar):
+# Scraper y sitio de cada supermercado, en el orden de las columnas del CSV
+SUPERMERCADOS = {
+    "carrefour": (scrape_carrefour_marca, "https://www.carrefour.com.ar"),
+    "coope": (scrape_coope, "https://www.lacoopeencasa.coop"),
+    "coto": (scrape_coto_all_pages, "https://www.cotodigital.com.ar"),
+    "dia": (scrape_dia, "https://diaonline.supermercadosdia.com.ar"),
+    "disco": (scrape_disco, "https://www.disco.com.ar"),
+    "vea": (scrape_vea_all_pages, "https://www.vea.com.ar"),
+}
+
+async def scrape_tienda(tienda, scraper, marca_a_buscar, pool=None, modo_vtex=None, resultados=None):
+    """Scraping de una tienda: búsqueda VTEX con fallback a Playwright, o sólo Playwright.
+
+    `modo_vtex` elige cómo se busca en las tiendas VTEX: "api" (API del catálogo, sin navegador),
+    "captura" (JSON de búsqueda que pide el storefront) o None (sólo el scraper del DOM).
+
+    Los productos se van acumulando en `resultados`, así una cancelación por tiempo no los pierde.
+    Todo lo que se mide adentro (spans y contadores) queda etiquetado con la marca y la tienda.
+    """
+    with etiquetas(marca=marca_a_buscar, tienda=tienda), span("tienda") as s:
+        try:
+            if modo_vtex and tienda in TIENDAS_VTEX:
+                buscar = None
+                if modo_vtex == "captura":
+                    buscar = lambda r: capturar_vtex(tienda, marca_a_buscar, pool=pool, resultados=r)
+                productos = await buscar_vtex_con_fallback(
+                    tienda, marca_a_buscar, lambda r: scraper(marca_a_buscar, pool=pool, resultados=r),
+                    resultados=resultados, buscar=buscar)
+            else:
+                productos = await scraper(marca_a_buscar, pool=pool, resultados=resultados)
+        except asyncio.CancelledError:
+            contar("timeouts", fase="presupuesto")
+            raise
+        except Exception as e:
+            contar_fallo(e, fase="tienda")
+            raise
+        s["productos"] = len(productos or [])
+        contar("productos", s["productos"])
+        return productos
+
+def trabajos_para(marcas, pool=None, modo_vtex=None):
+    """Arma la matriz completa marca × supermercado de trabajos para el planificador"""
+    trabajos = []
+    for marca in marcas:
+        for tienda, (scraper, url) in SUPERMERCADOS.items():
+            parciales = []
+            fabrica = (lambda t=tienda, s=scraper, m=marca, p=parciales: scrape_tienda(t, s, m, pool, modo_vtex, p))
+            trabajos.append(crear_trabajo(marca, tienda, host_de(url), fabrica, parciales))
+    return trabajos
+
+def productos_por_tienda(registros):
+    """Reporta cada trabajo y devuelve {tienda: productos} para una marca"""
+    datos = {}
+    for registro in registros:
+        tienda = registro["tienda"]
+        if registro["error"] is not None:
+            print(f"❌ Error {tienda}: {repr(registro['error'])}")
+        elif registro["estado"] == "sin_tiempo":
+            print(f"⏭️ {tienda}: sin tiempo para empezar")
+        elif registro["estado"] == "parcial":
+            print(f"⏳ {tienda}: {len(registro['productos'])} productos (parcial, se agotó el tiempo tras "
+                  f"{registro['duracion']:.1f}s)")
+        else:
+            print(f"✅ {tienda}: {len(registro['productos'])} productos ({registro['duracion']:.1f}s)")
+        datos[tienda] = registro["productos"]
+    return datos
+
+async def scrape_all(marca_a_buscar, pool=None, modo_vtex=None):
     """Ejecuta scraping completo para una marca"""
     fecha = datetime.now().strftime("%Y-%m-%d")
     print(f"🚀 Iniciando scraping para: {marca_a_buscar}")
+    registros = await ejecutar_trabajos(trabajos_para([marca_a_buscar], pool, modo_vtex))
+    guardar_marca(marca_a_buscar, fecha, productos_por_tienda(registros))
+
+def reporte_cobertura(registros):
+    """Por supermercado: marcas completas, parciales, con error o sin tiempo, y productos obtenidos"""
+    print("\n📋 Cobertura por supermercado:")
+    for tienda in SUPERMERCADOS:
+        propios = [r for r in registros if r["tienda"] == tienda]
+        if not propios:
+            continue
+        estados = {}
+        for registro in propios:
+            estados[registro["estado"]] = estados.get(registro["estado"], 0) + 1
+        detalle = ", ".join(f"{cantidad} {estado}" for estado, cantidad in sorted(estados.items()))
+        productos = sum(len(r["productos"]) for r in propios)
+        print(f"   {tienda.capitalize():12}: {estados.get('completo', 0)}/{len(propios)} marcas completas "
+              f"({detalle}) | {productos} productos")
+
+def indexar_precios(productos):
+    """{nombre: precio} de un supermercado; ante nombres repetidos gana el primero"""
+    indice = {}
+    for producto in productos:
+        indice.setdefault(producto["nombre"], producto["precio"])
+    return indice
+
+def construir_tabla_precios(fecha, datos_por_tienda):
+    """Tabla ancha fecha, producto, carrefour…vea en una sola pasada por supermercado"""
+    indices = {tienda: indexar_precios(datos_por_tienda.get(tienda, [])) for tienda in SUPERMERCADOS}
+    nombres_unicos = pd.Series(sorted(set().union(*indices.values())), dtype=object)
     
-    # Scraper Carrefour
-    try:
-        carrefour = await scrape_carrefour_marca(marca_a_buscar)
-        print(f"✅ Carrefour: {len(carrefour)} productos")
-    except Exception as e:
-        print(f"❌ Error Carrefour: {repr(e)}")
-        carrefour = []
-    
-    await asyncio.sleep(3)
-    
-    # Otros scrapers en paralelo
-    resultados_otros = await scrape_otros_5(marca_a_buscar)
-    nombres_scrapers = ["coope", "coto", "dia", "disco", "vea"]
-    datos_otros = []
-    
-    for nombre_scraper, r in zip(nombres_scrapers, resultados_otros):
-        if isinstance(r, Exception):
-            print(f"❌ Error {nombre_scraper}: {repr(r)}")
-            datos_otros.append([])
-        elif r is None:
-            datos_otros.append([])
-        else:
-            print(f"✅ {nombre_scraper}: {len(r)} productos")
-            datos_otros.append(r)
-    
-    coope, coto, dia, disco, vea = datos_otros
-    
-    # Compilar todos los datos
-    datos = [carrefour, coope, coto, dia, disco, vea]
-    
+    df_precios = pd.DataFrame({"fecha": fecha, "producto": nombres_unicos})
+    for tienda, indice in indices.items():
+        df_precios[tienda] = nombres_unicos.map(indice)
+    return df_precios
+
+def guardar_marca(marca_a_buscar, fecha, datos_por_tienda, data_raw_path=os.path.join("Data", "Raw")):
+    """Arma la tabla ancha de precios de una marca, la guarda en `data_raw_path` y la devuelve"""
     # Verificar que tenemos productos
-    total_productos = sum(len(d) for d in datos)
+    total_productos = sum(len(d) for d in datos_por_tienda.values())
     if total_productos == 0:
         print(f"⚠️ No se encontraron productos para '{marca_a_buscar}'")
-        return
+        return None
     
-    # Obtener nombres únicos de productos
-    nombres_unicos = sorted(set(p['nombre'] for r in datos for p in r))
-    print(f"📊 Total productos únicos: {len(nombres_unicos)}")
-    
-    # Crear DataFrame
-    filas = []
-    for nombre_producto in nombres_unicos:
-        fila = {
-            "fecha": fecha,
-            "producto": nombre_producto,
-            "carrefour": obtener_precio(carrefour, nombre_producto),
-            "coope": obtener_precio(coope, nombre_producto),
-            "coto": obtener_precio(coto, nombre_producto),
-            "dia": obtener_precio(dia, nombre_producto),
-            "disco": obtener_precio(disco, nombre_producto),
-            "vea": obtener_precio(vea, nombre_producto),
-        }
-        filas.append(fila)
-    
-    df_precios = pd.DataFrame(filas)
+    df_precios = construir_tabla_precios(fecha, datos_por_tienda)
+    print(f"📊 Total productos únicos: {len(df_precios)}")
     
     # Crear directorio Data/Raw si no existe
-    data_raw_path = os.path.join("Data", "Raw")
     os.makedirs(data_raw_path, exist_ok=True)
     
     # Generar nombre de archivo y ruta completa
@@ -106,44 +159,199 @@ async def scrape_all(marca_a_buscar):
     for super in supermercados:
         productos_con_precio = df_precios[super].notna().sum()
         print(f"   {super.capitalize():12}: {productos_con_precio:2d} productos")
+    return df_precios
+
+# -------------------- Pipeline en streaming (--streaming) --------------------
+# Cada resultado marca × supermercado entra a una cola apenas termina su scraping y se parsea y
+# unifica ahí mismo, mientras siguen los supermercados más lentos. Cuando llegan todos los de una
+# marca, el CSV crudo se escribe en Data/Raw y el día va directo al histórico; si eso sale bien, el
+# CSV pasa a Data/Used (ya procesado).
+
+def normalizar_tienda(productos, matcher):
+    """Precios ({nombre: float}) y nombres unificados de un supermercado. Los productos de la API de
+    VTEX traen el precio numérico en "precio_venta": ese se usa tal cual y sólo se parsea el texto"""
+    indice, exactos = {}, {}
+    for producto in productos:
+        nombre = producto["nombre"]
+        if nombre in indice:
+            continue  # Ante nombres repetidos gana el primero, como en indexar_precios
+        indice[nombre] = producto["precio"]
+        if producto.get("precio_venta"):
+            exactos[nombre] = float(producto["precio_venta"])
+    textos = {nombre: precio for nombre, precio in indice.items() if nombre not in exactos}
+    precios, no_parseables = parse_price_series(pd.Series(list(textos.values()), index=list(textos), dtype=object))
+    return {**precios.to_dict(), **exactos}, matcher.resolve_many(indice), no_parseables
 
-def obtener_precio(lista_productos_supermercado, nombre_producto_buscado):
-    """Busca el precio de un producto en la lista de un supermercado"""
-    for producto in lista_productos_supermercado:
-        if producto["nombre"] == nombre_producto_buscado:
-            return producto["precio"]
-    return np.nan
+def cerrar_marca(marca, fecha, datos_por_tienda, normalizados, matcher, almacenamiento=STORAGE_MODE):
+    """Arma el día unificado de la marca con los supermercados ya normalizados y lo guarda"""
+    slug = marca.replace(" ", "_").lower()
+    df = construir_tabla_precios(fecha, datos_por_tienda)[["fecha", PRODUCT_COLUMN]]
+    resueltos = {}
+    for tienda in SUPERMARKET_COLUMNS:
+        precios, resueltos_tienda, _ = normalizados.get(tienda, ({}, {}, 0))
+        df[tienda] = df[PRODUCT_COLUMN].map(precios).astype("float64")
+        resueltos.update(resueltos_tienda)
+    df["producto_unificado"] = df[PRODUCT_COLUMN].map(resueltos).fillna(df[PRODUCT_COLUMN])
+
+    no_parseables = sum(n for _, _, n in normalizados.values())
+    if no_parseables:
+        print(f"Precios no parseables ({no_parseables})")
+
+    unified_df = aggregate_unified(df, PRODUCT_COLUMN, SUPERMARKET_COLUMNS)
+    print(f"Número total de productos unificados: {unified_df['producto_unificado'].nunique()}")
+    if EXPORT_CLEANED_CSV and almacenamiento == "snapshots":
+        export_unified(unified_df, CLEANED_DATA_PATH, slug, fecha)
+    store_unified(unified_df, slug, almacenamiento)
+    matcher.save()
+    print(f"📚 Agregado al histórico: {slug}")
+
+def _normalizar_registro(registro, matchers):
+    """Parsea y unifica los productos de un registro (crea el matcher de la marca la primera vez)"""
+    slug = registro["marca"].replace(" ", "_").lower()
+    if slug not in matchers:
+        matchers[slug] = ProductMatcher(slug, UNIFICATION_MAPS[slug])
+    return normalizar_tienda(registro["productos"], matchers[slug])
+
+async def _cerrar_marca_completa(marca, fecha, datos, normalizados, matchers, almacenamiento):
+    """Guarda el CSV crudo en Data/Raw y, si la marca se pudo unificar, la pasa al histórico y
+    mueve el CSV a Data/Used. Si no, el CSV queda en Data/Raw para unify_product_names.py"""
+    slug = marca.replace(" ", "_").lower()
+    if guardar_marca(marca, fecha, datos) is None:
+        return
+    if slug not in UNIFICATION_MAPS:
+        print(f"⚠️ No hay 'unification_map' para '{marca}', queda sin unificar en {RAW_DATA_PATH}")
+        return
+    if normalizados is None:
+        print(f"⚠️ '{marca}' no se pudo unificar en streaming, queda en {RAW_DATA_PATH}")
+        return
+    with etiquetas(marca=marca), span("guardar"):
+        await asyncio.to_thread(cerrar_marca, marca, fecha, datos, normalizados, matchers[slug], almacenamiento)
+    nombre_archivo = f"precios_async_{fecha}_{slug}.csv"
+    os.makedirs(USED_DATA_PATH, exist_ok=True)
+    os.replace(os.path.join(RAW_DATA_PATH, nombre_archivo), os.path.join(USED_DATA_PATH, nombre_archivo))
+
+async def consumir_resultados(cola, marcas, fecha, almacenamiento=STORAGE_MODE):
+    """Consume los registros de `ejecutar_trabajos` hasta el None final y guarda cada marca completa.
+
+    Un error con un registro o una marca no corta el consumo: la marca queda en Data/Raw.
+    """
+    pendientes = {marca: set(SUPERMERCADOS) for marca in marcas}
+    recibidos = {marca: {} for marca in marcas}     # tienda -> productos crudos
+    normalizados = {marca: {} for marca in marcas}  # tienda -> (precios, nombres unificados, no parseables); None si falló
+    matchers = {}
+
+    while (registro := await cola.get()) is not None:
+        marca, tienda = registro["marca"], registro["tienda"]
+        slug = marca.replace(" ", "_").lower()
+        try:
+            try:
+                recibidos[marca].update(productos_por_tienda([registro]))
+                if slug in UNIFICATION_MAPS and normalizados[marca] is not None:
+                    with etiquetas(marca=marca, tienda=tienda), span("unificar"):
+                        normalizados[marca][tienda] = await asyncio.to_thread(_normalizar_registro, registro, matchers)
+            except Exception as e:
+                # Sin este supermercado unificado, la marca entera queda para el flujo por archivos
+                contar_fallo(e, fase="unificar")
+                print(f"❌ Error unificando '{marca}' en {tienda}: {repr(e)}")
+                recibidos[marca].setdefault(tienda, registro.get("productos") or [])
+                normalizados[marca] = None
+
+            pendientes[marca].discard(tienda)
+            if pendientes[marca]:
+                continue
+            print(f"\n{'='*50}\n🔍 MARCA COMPLETA: {marca}\n{'='*50}")
+            await _cerrar_marca_completa(marca, fecha, recibidos.pop(marca), normalizados.pop(marca),
+                                         matchers, almacenamiento)
+        except Exception as e:
+            # Lo que se haya escrito en Data/Raw queda para que unify_product_names.py lo reprocese
+            contar_fallo(e, fase="guardar")
+            print(f"❌ Error guardando '{marca}' en el histórico: {repr(e)}")
+
+async def main(argv=None):
+    """Función principal: scrapea todas las marcas en todos los supermercados a la vez"""
+    parser = argparse.ArgumentParser(description="Scraping de precios por marca")
+    parser.add_argument("marca", nargs="*", help="Marca a buscar (por defecto: Not, Vegetalex y Felices Las Vacas)")
+    modos_vtex = parser.add_mutually_exclusive_group()
+    modos_vtex.add_argument("--vtex-api", dest="modo_vtex", action="store_const", const="api",
+                            help="Usar la API de catálogo VTEX en Carrefour, Dia, Disco y Vea (Playwright como fallback)")
+    modos_vtex.add_argument("--vtex-captura", dest="modo_vtex", action="store_const", const="captura",
+                            help="En Carrefour, Dia, Disco y Vea leer el JSON de búsqueda que pide la página "
+                                 "en lugar del DOM (scraper del DOM como fallback)")
+    parser.add_argument("--sin-bloqueo", action="store_true",
+                        help="No bloquear imágenes, fuentes, media ni dominios de terceros")
+    parser.add_argument("--max-concurrencia", type=int, default=MAX_CONCURRENCIA,
+                        help="Trabajos marca × supermercado simultáneos en total")
+    parser.add_argument("--max-por-host", type=int, default=MAX_POR_HOST,
+                        help="Trabajos simultáneos contra un mismo supermercado")
+    parser.add_argument("--pausa-por-host", type=float, default=PAUSA_POR_HOST,
+                        help="Segundos mínimos entre dos arranques contra un mismo supermercado")
+    parser.add_argument("--presupuesto-tienda", type=float, default=PRESUPUESTO_POR_TRABAJO,
+                        help="Segundos máximos por marca × supermercado; al agotarse se guarda lo leído hasta ahí")
+    parser.add_argument("--presupuesto-total", type=float, default=PRESUPUESTO_TOTAL,
+                        help="Segundos máximos de toda la corrida de scraping")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Unificar y guardar en el histórico cada marca apenas terminan sus supermercados "
+                             "(el CSV crudo queda en Data/Used)")
+    parser.add_argument("--almacenamiento", choices=["snapshots", "deltas"], default=STORAGE_MODE,
+                        help="Con --streaming: CSV completo por día en Data/Cleaned o sólo cambios")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
 
-async def main():
-    """Función principal que maneja la ejecución secuencial de las marcas"""
     marcas_a_scrapear = ["Not", "Vegetalex", "Felices Las Vacas"]
     
-    if len(sys.argv) > 1:
-        marcas_a_scrapear = [" ".join(sys.argv[1:])]
+    if args.marca:
+        marcas_a_scrapear = [" ".join(args.marca)]
     
     print(f"🎯 Scraping marcas: {', '.join(marcas_a_scrapear)}")
     
     inicio_total = time.time()
+    fecha = datetime.now().strftime("%Y-%m-%d")
     
-    for i, marca in enumerate(marcas_a_scrapear, 1):
-        print(f"\n{'='*50}")
-        print(f"🔍 MARCA {i}/{len(marcas_a_scrapear)}: {marca}")
-        print(f"{'='*50}")
-        
-        inicio_marca = time.time()
-        
+    # Un único Chromium y toda la matriz marca × supermercado en paralelo
+    with span("corrida"):
+        cola = asyncio.Queue() if args.streaming else None
+        consumidor = None
+        if args.streaming:
+            consumidor = asyncio.create_task(
+                consumir_resultados(cola, marcas_a_scrapear, fecha, args.almacenamiento))
         try:
-            await scrape_all(marca)
-            fin_marca = time.time()
-            tiempo_marca = fin_marca - inicio_marca
-            print(f"⏱️ Tiempo {marca}: {tiempo_marca:.1f}s")
+            async with BrowserPool(bloquear_recursos=not args.sin_bloqueo) as pool:
+                registros = await ejecutar_trabajos(
+                    trabajos_para(marcas_a_scrapear, pool, args.modo_vtex),
+                    max_concurrencia=args.max_concurrencia,
+                    max_por_host=args.max_por_host,
+                    pausa_por_host=args.pausa_por_host,
+                    presupuesto_por_trabajo=args.presupuesto_tienda,
+                    presupuesto_total=args.presupuesto_total,
+                    al_terminar=cola.put_nowait if args.streaming else None,
+                )
+        finally:
+            if consumidor is not None:
+                cola.put_nowait(None)
+                await consumidor
+    
+    if not args.streaming:
+        for i, marca in enumerate(marcas_a_scrapear, 1):
+            print(f"\n{'='*50}")
+            print(f"🔍 MARCA {i}/{len(marcas_a_scrapear)}: {marca}")
+            print(f"{'='*50}")
             
-            if i < len(marcas_a_scrapear):
-                await asyncio.sleep(5)
-                
-        except Exception as e:
-            print(f"❌ Error procesando '{marca}': {repr(e)}")
-            continue
+            try:
+                guardar_marca(marca, fecha, productos_por_tienda([r for r in registros if r["marca"] == marca]))
+            except Exception as e:
+                print(f"❌ Error procesando '{marca}': {repr(e)}")
+                continue
+    
+    reporte_cobertura(registros)
+    
+    if pool.recursos:
+        print("\n🧱 Recursos bloqueados por supermercado:")
+        resumen_recursos(pool.recursos)
+    
+    # Spans y contadores de la corrida: JSON lines para analizar y texto de Prometheus para alertas
+    exportar_jsonl(os.path.join(METRICAS_PATH, f"scraping_{fecha}.jsonl"))
+    exportar_prometheus(os.path.join(METRICAS_PATH, "scraping.prom"))
+    print("\n⏳ Fases más lentas por supermercado:")
+    resumen_metricas()
     
     fin_total = time.time()
     tiempo_total = fin_total - inicio_total
@@ -1,124 +1,124 @@
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import abrir_contexto
+from metrics import contar_fallo, span
+from page_ready import esperar_grilla_estable
 
-async def scrape_carrefour_marca(marca: str):
-    base_url = f"https://www.carrefour.com.ar/{marca}?_q={marca}&map=ft&page={{}}"
-    all_products = []
-    seen_product_names = set()
+SELECTOR_PRODUCTOS = "div.valtech-carrefourar-search-result-3-x-gallery > div > section > a"
+MAX_PAGINAS = 10  # Límite de seguridad
+PESTANIAS = 3     # Páginas de resultados que se cargan a la vez
 
-    async def scroll_para_cargar_suave(page):
-        """Scroll más suave y gradual"""
-        # Hacer scroll gradual hasta el final
-        for i in range(10):
-            await page.mouse.wheel(0, 800)
-            await asyncio.sleep(1.5)
-        
-        # Scroll final hasta abajo
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await asyncio.sleep(3)
-        
-        # Volver arriba para procesar
-        await page.evaluate("window.scrollTo(0, 0)")
-        await asyncio.sleep(1)
+# Devuelve [cantidad de tarjetas, [[nombre, precio], ...]] ya filtrado por marca.
+# El precio es el primero que no está tachado (ni él ni su contenedor tienen "strikethrough")
+JS_EXTRAER_PRODUCTOS = """
+([selector, marca]) => {
+    const marcaBuscada = marca.toLowerCase();
+    const tarjetas = [...document.querySelectorAll(selector)];
+    const productos = [];
+    for (const tarjeta of tarjetas) {
+        const nombreEl = tarjeta.querySelector("span.vtex-product-summary-2-x-productBrand");
+        const nombre = nombreEl ? nombreEl.innerText.trim() : "Nombre no disponible";
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
-        
+        let precio = "Precio no disponible";
+        for (const span of tarjeta.querySelectorAll("span.valtech-carrefourar-product-price-0-x-currencyContainer")) {
+            const clases = String(span.className);
+            const clasesPadre = span.parentElement ? String(span.parentElement.className) : "";
+            if (!clases.includes("strikethrough") && !clasesPadre.includes("strikethrough")) {
+                precio = span.innerText.trim();
+                break;
+            }
+        }
+
+        const nombreProducto = nombre.toLowerCase();
+        if (nombreProducto.includes(marcaBuscada)
+            || (marcaBuscada === "felices las vacas" && nombreProducto.includes("jogurtti"))) {
+            productos.push([nombre, precio]);
+        }
+    }
+    return [tarjetas.length, productos];
+}
+"""
+
+async def scroll_para_cargar_suave(page):
+    """Scroll más suave y gradual"""
+    # Hacer scroll gradual hasta el final
+    for i in range(10):
+        await page.mouse.wheel(0, 800)
+        await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=1500, quietud_ms=300)
+    
+    # Scroll final hasta abajo
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=3000)
+    
+    # Volver arriba para procesar
+    await page.evaluate("window.scrollTo(0, 0)")
+
+async def leer_pagina(context, url, numero, marca):
+    """Lee una página de resultados en una pestaña propia; devuelve (tarjetas, productos) o None si falla"""
+    page = await context.new_page()
+    try:
         # Configurar timeouts más conservadores
         page.set_default_timeout(15000)
-
-        current_page = 1
-        max_pages = 10  # Límite de seguridad
+        print(f"\n🌐 Visitando página {numero}: {url}")
         
-        while current_page <= max_pages:
-            url = base_url.format(current_page)
-            print(f"\n🌐 Visitando página {current_page}: {url}")
-            
-            try:
-                # Navegación simple sin networkidle
+        try:
+            # Navegación simple sin networkidle
+            with span("goto", pagina=numero):
                 await page.goto(url, timeout=20000)
-                await asyncio.sleep(3)
-                
-            except Exception as e:
-                print(f"❌ Error cargando página {current_page}: {e}")
-                break
             
-            # Intentar encontrar la galería
-            try:
+        except Exception as e:
+            contar_fallo(e, fase="goto")
+            print(f"❌ Error cargando página {numero}: {e}")
+            return None
+        
+        # Intentar encontrar la galería
+        try:
+            with span("wait", pagina=numero):
                 await page.wait_for_selector("div.valtech-carrefourar-search-result-3-x-gallery", timeout=15000)
-            except:
-                print("❌ Galería no encontrada")
-                break
+                await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=5000, minimo=0)
+        except Exception as e:
+            contar_fallo(e, fase="wait")
+            print(f"❌ Galería no encontrada en la página {numero}")
+            return None
 
-            # Realizar scroll suave
+        # Realizar scroll suave
+        with span("scroll", pagina=numero):
             await scroll_para_cargar_suave(page)
 
-            # Buscar productos
-            products = page.locator("div.valtech-carrefourar-search-result-3-x-gallery > div > section > a")
-            count = await products.count()
+        # Extraer nombre y precio de todas las tarjetas en una sola llamada
+        with span("extract", pagina=numero) as s:
+            count, products = await page.evaluate(JS_EXTRAER_PRODUCTOS, [SELECTOR_PRODUCTOS, marca])
+            s["productos"] = len(products)
+        return count, products
+    finally:
+        if not page.is_closed():
+            await asyncio.shield(page.close())
 
-            if count == 0:
-                break
+async def scrape_carrefour_marca(marca: str, pool=None, resultados=None, pestanias=PESTANIAS):
+    """Recorre las páginas `page=1..MAX_PAGINAS` de a `pestanias` a la vez, en pestañas de un mismo contexto.
 
-            # Procesar productos
-            products_processed = 0
-            for i in range(count):
-                product = products.nth(i)
-                try:
-                    # Obtener nombre
-                    name = "Nombre no disponible"
-                    try:
-                        name_element = product.locator("span.vtex-product-summary-2-x-productBrand")
-                        if await name_element.count() > 0:
-                            name = await name_element.inner_text(timeout=5000)
-                            name = name.strip()
-                    except:
-                        pass
+    Corta en la primera página vacía (o que falla); las páginas de la misma tanda posteriores a
+    ella se descartan. Con `pestanias=1` recorre una página por vez, como antes.
+    """
+    base_url = f"https://www.carrefour.com.ar/{marca}?_q={marca}&map=ft&page={{}}"
+    # Los productos se agregan a `resultados` a medida que se leen: si se agota el tiempo, quedan los ya leídos
+    all_products = [] if resultados is None else resultados
+    seen_product_names = set()
 
-                    # Obtener precio
-                    price = "Precio no disponible"
-                    try:
-                        price_spans = product.locator("span.valtech-carrefourar-product-price-0-x-currencyContainer")
-                        count_prices = await price_spans.count()
-                        
-                        for j in range(count_prices):
-                            span = price_spans.nth(j)
-                            classes = await span.evaluate("e => e.className")
-                            parent_classes = await span.evaluate("e => e.parentElement.className")
-                            
-                            if "strikethrough" not in classes and "strikethrough" not in parent_classes:
-                                price = await span.inner_text(timeout=3000)
-                                price = price.strip()
-                                break
-                    except:
-                        pass
+    async with abrir_contexto(pool, "carrefour") as context:
+        for primera in range(1, MAX_PAGINAS + 1, max(pestanias, 1)):
+            numeros = range(primera, min(primera + max(pestanias, 1), MAX_PAGINAS + 1))
+            paginas = await asyncio.gather(*(leer_pagina(context, base_url.format(n), n, marca) for n in numeros))
 
-                    # Filtrar por marca
-                    nombre_producto = name.lower()
-                    marca_buscada = marca.lower()
-                    
-                    should_include = False
-                    if marca_buscada in nombre_producto:
-                        should_include = True
-                    elif marca_buscada == "felices las vacas" and "jogurtti" in nombre_producto:
-                        should_include = True
-                    
-                    if should_include and name not in seen_product_names:
+            # Se combinan en orden de página, así el primer precio visto de cada nombre es el mismo que antes
+            for pagina in paginas:
+                if pagina is None or pagina[0] == 0:
+                    return all_products
+                for name, price in pagina[1]:
+                    if name not in seen_product_names:
                         seen_product_names.add(name)
-                        all_products.append((name, price))
-                        products_processed += 1
-                        
-                except Exception as e:
-                    continue
-
-            # Pausa entre páginas
-            await asyncio.sleep(2)
-            current_page += 1
+                        all_products.append({"nombre": name, "precio": price})
 
-        await browser.close()
-        return [{"nombre": name, "precio": price} for name, price in all_products]
+    return all_products
 
 if __name__ == "__main__":
     marca = "not"
@@ -1,73 +1,130 @@
-import re
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import abrir_contexto
+from metrics import contar, span
+from page_ready import esperar_grilla_estable, huella_grilla
+from url_pagination import PESTANIAS, con_pagina, leer_paginas, total_paginas
 
-async def scrape_coope(busqueda, max_pages=5):
-    url = "https://www.lacoopeencasa.coop/"
-    productos = []
-    patron = re.compile(re.escape(busqueda), re.IGNORECASE)
+SELECTOR_PRODUCTOS = "div.card-content"
+SELECTOR_PAGINACION = "ul.pagination li"
+PARAMETRO_PAGINA = "pagina"  # Parámetro de página del listado de búsqueda
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_selector("input#idInputBusqueda")
-        await page.fill("input#idInputBusqueda", busqueda)
-        await page.keyboard.press("Enter")
-        await page.wait_for_selector("div.card-content", timeout=40000)
-
-        for _ in range(max_pages):
-            previous_height = 0
-            while True:
-                await page.evaluate("window.scrollBy(0, 1000)")
-                await asyncio.sleep(1)
-                current_height = await page.evaluate("document.body.scrollHeight")
-                if current_height == previous_height:
-                    break
-                previous_height = current_height
-
-            cards = await page.query_selector_all("div.card-content")
-            for card in cards:
-                nombre_elem = await card.query_selector("div.card-descripcion p.text-capitalize")
-                nombre = await nombre_elem.inner_text() if nombre_elem else ""
-                nombre = nombre.strip()
-
-                nombre_minuscula = nombre.lower()
-                if any(palabra in nombre_minuscula for palabra in ["pinot", "notebook"]):
-                    continue
-
-                precio_entero = await card.query_selector("div.precio-entero")
-                precio_decimal = await card.query_selector("div.precio-decimal")
-
-                precio_text = ""
-                if precio_entero:
-                    precio_text = (await precio_entero.inner_text()).strip()
-
-                if precio_decimal:
-                    precio_text += "," + (await precio_decimal.inner_text()).strip()
-                else:
-                    precio_text += ",00"
-
-                precio = "$" + precio_text.replace(" ", "")
-
-                productos.append({
-                    "nombre": nombre,
-                    "precio": precio
-                })
-
-            btn_siguiente = await page.query_selector("ul.pagination li.waves-effect svg use[href*='derecha']")
-            if btn_siguiente:
-                btn_siguiente_parent = await btn_siguiente.evaluate_handle("node => node.closest('li')")
-                if btn_siguiente_parent:
-                    await btn_siguiente_parent.click()
-                    await page.wait_for_timeout(4000)
-                    await page.wait_for_selector("div.card-content", timeout=40000)
-                else:
-                    break
-            else:
+# Productos que aparecen en la búsqueda pero no son de la marca
+PALABRAS_EXCLUIDAS = ["pinot", "notebook"]
+
+# Devuelve [[nombre, precio], ...] sin los productos excluidos; el precio se arma como "$entero,decimal"
+JS_EXTRAER_PRODUCTOS = """
+([selector, excluidas]) => {
+    const productos = [];
+    for (const card of document.querySelectorAll(selector)) {
+        const nombreEl = card.querySelector("div.card-descripcion p.text-capitalize");
+        const nombre = nombreEl ? nombreEl.innerText.trim() : "";
+        const nombreMinuscula = nombre.toLowerCase();
+        if (excluidas.some(palabra => nombreMinuscula.includes(palabra))) {
+            continue;
+        }
+
+        const entero = card.querySelector("div.precio-entero");
+        const decimal = card.querySelector("div.precio-decimal");
+        let precioTexto = entero ? entero.innerText.trim() : "";
+        precioTexto += decimal ? "," + decimal.innerText.trim() : ",00";
+
+        productos.push([nombre, "$" + precioTexto.replaceAll(" ", "")]);
+    }
+    return productos;
+}
+"""
+
+async def scroll_hasta_el_final(page, pagina):
+    with span("scroll", pagina=pagina):
+        previous_height = 0
+        while True:
+            await page.evaluate("window.scrollBy(0, 1000)")
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=1000, quietud_ms=300)
+            current_height = await page.evaluate("document.body.scrollHeight")
+            if current_height == previous_height:
                 break
+            previous_height = current_height
+
+async def extraer(page, pagina):
+    """Productos de la página ya cargada en `page`"""
+    await scroll_hasta_el_final(page, pagina)
+    # Nombre y precio de todas las tarjetas en una sola llamada
+    with span("extract", pagina=pagina) as s:
+        tarjetas = await page.evaluate(JS_EXTRAER_PRODUCTOS, [SELECTOR_PRODUCTOS, PALABRAS_EXCLUIDAS])
+        s["productos"] = len(tarjetas)
+    return [{"nombre": nombre, "precio": precio} for nombre, precio in tarjetas]
+
+async def leer_pagina(page, url, pagina):
+    with span("goto", pagina=pagina):
+        await page.goto(url)
+    with span("wait", pagina=pagina):
+        await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+    return await extraer(page, pagina)
+
+async def paginar_con_clicks(page, desde, max_pages, productos=None):
+    """Recorre las páginas `desde`..`max_pages` con la flecha del paginador, a partir de la abierta en
+    `page`, y agrega los productos de cada una a `productos` apenas la lee"""
+    productos = [] if productos is None else productos
+    for pagina in range(desde, max_pages + 1):
+        btn_siguiente = await page.query_selector("ul.pagination li.waves-effect svg use[href*='derecha']")
+        if not btn_siguiente:
+            break
+        btn_siguiente_parent = await btn_siguiente.evaluate_handle("node => node.closest('li')")
+        if not btn_siguiente_parent:
+            break
+        with span("paginar", pagina=pagina):
+            huella = await huella_grilla(page, SELECTOR_PRODUCTOS)
+            await btn_siguiente_parent.click()
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, distinto_de=huella)
+            await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+        productos.extend(await extraer(page, pagina))
+    return productos
+
+async def scrape_coope(busqueda, max_pages=5, pool=None, resultados=None, pestanias=PESTANIAS):
+    """Busca desde el inicio, toma del paginador la cantidad de páginas y carga el resto por URL
+    (parámetro PARAMETRO_PAGINA sobre la URL del listado) de a `pestanias` a la vez; si alguna no
+    se puede leer así, vuelve a la flecha del paginador"""
+    url = "https://www.lacoopeencasa.coop/"
+    productos = [] if resultados is None else resultados
+
+    async with abrir_contexto(pool, "coope") as context:
+        page = await context.new_page()
+        try:
+            with span("goto", pagina=1):
+                await page.goto(url)
+            with span("wait", pagina=1):
+                await page.wait_for_selector("input#idInputBusqueda")
+                await page.fill("input#idInputBusqueda", busqueda)
+                await page.keyboard.press("Enter")
+                await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+
+            primera = await extraer(page, 1)
+            productos.extend(primera)
+            total = min(await total_paginas(page, SELECTOR_PAGINACION), max_pages)
+            if total > 1:
+                url_listado = page.url
+                # Cada página se agrega en orden apenas están todas las anteriores; una que no cargó, o
+                # igual a la primera (el sitio ignoró el parámetro), invalida el resto de la tanda
+                inicio = len(productos)
+                valida = True
+
+                def agregar(numero, leida):
+                    nonlocal valida
+                    valida = valida and leida is not None and (not primera or leida != primera)
+                    if valida:
+                        productos.extend(leida)
 
-        await browser.close()
+                await leer_paginas(
+                    context, range(2, total + 1),
+                    lambda p, n: leer_pagina(p, con_pagina(url_listado, n, PARAMETRO_PAGINA), n), pestanias, al_leer=agregar)
+                if not valida:
+                    print("⚠️ coope: la paginación por URL falló, se recorre con el paginador")
+                    contar("reintentos", motivo="paginacion_clicks")
+                    del productos[inicio:]  # Sólo lo que agregaron las páginas por URL
+                    await paginar_con_clicks(page, 2, max_pages, productos)
+        finally:
+            if not page.is_closed():
+                await asyncio.shield(page.close())
 
     return productos
 
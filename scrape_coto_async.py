@@ -1,49 +1,65 @@
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import abrir_pagina, USER_AGENT
+from metrics import contar_fallo, span
+from page_ready import esperar_grilla_estable, huella_grilla
 
-async def scrape_coto_all_pages(marca):
+SELECTOR_PRODUCTOS = "div.centro-precios"
+MAX_PAGINAS = 20  # Límite de seguridad del botón "Siguiente"
+
+# Devuelve [[nombre, precio], ...] de las tarjetas que tienen ambos datos
+JS_EXTRAER_PRODUCTOS = """
+(selector) => {
+    const productos = [];
+    for (const tarjeta of document.querySelectorAll(selector)) {
+        const nombreEl = tarjeta.querySelector("h3.nombre-producto");
+        const precioEl = tarjeta.querySelector("h4.card-title");
+        if (nombreEl && precioEl) {
+            productos.push([nombreEl.innerText.trim(), precioEl.innerText.trim()]);
+        }
+    }
+    return productos;
+}
+"""
+
+async def scrape_coto_all_pages(marca, pool=None, max_pages=MAX_PAGINAS, resultados=None):
     url = f"https://www.cotodigital.com.ar/sitios/cdigi/categoria?_dyncharset=utf-8&Dy=1&Ntt={marca}&idSucursal=200"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=[
-            "--disable-blink-features=AutomationControlled",
-        ])
-        context = await browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ))
-        page = await context.new_page()
-        await page.goto(url)
-        await asyncio.sleep(5)
-
-        all_productos = []
-
-        while True:
+    async with abrir_pagina(pool, "coto", user_agent=USER_AGENT) as page:
+        with span("goto", pagina=1):
+            await page.goto(url)
+        with span("wait", pagina=1):
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS)
+
+        all_productos = [] if resultados is None else resultados
+        pagina = 1
+
+        while pagina <= max_pages:
             try:
-                await page.wait_for_selector("div.centro-precios", timeout=40000)
-            except:
+                with span("wait", pagina=pagina):
+                    await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+            except Exception as e:
+                contar_fallo(e, fase="wait")
                 break
 
-            productos = await page.query_selector_all("div.centro-precios")
-            for producto in productos:
-                nombre_elem = await producto.query_selector("h3.nombre-producto")
-                precio_elem = await producto.query_selector("h4.card-title")
-                if nombre_elem and precio_elem:
-                    nombre = (await nombre_elem.inner_text()).strip()
-                    precio = (await precio_elem.inner_text()).strip()
-                    all_productos.append({"nombre": nombre, "precio": precio})
+            # Nombre y precio de todas las tarjetas en una sola llamada
+            with span("extract", pagina=pagina) as s:
+                productos = await page.evaluate(JS_EXTRAER_PRODUCTOS, SELECTOR_PRODUCTOS)
+                s["productos"] = len(productos)
+            for nombre, precio in productos:
+                all_productos.append({"nombre": nombre, "precio": precio})
 
             siguiente = await page.query_selector("a.page-link.page-back-next:has-text('Siguiente')")
             if siguiente and await siguiente.is_visible():
                 clases = await siguiente.get_attribute("class")
-                if clases and "disabled" in clases:
+                if (clases and "disabled" in clases) or pagina == max_pages:
                     break
-                await siguiente.click()
-                await asyncio.sleep(5)
+                pagina += 1
+                with span("paginar", pagina=pagina):
+                    huella = await huella_grilla(page, SELECTOR_PRODUCTOS)
+                    await siguiente.click()
+                    await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, distinto_de=huella)
             else:
                 break
 
-        await browser.close()
     return all_productos
 
 if __name__ == "__main__":
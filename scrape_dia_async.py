@@ -1,45 +1,55 @@
 import asyncio
-from playwright.async_api import async_playwright
-
-async def scrape_dia(marca):
+from browser_pool import abrir_pagina, USER_AGENT
+from metrics import span
+from page_ready import esperar_grilla_estable
+
+SELECTOR_NOMBRES = "div.vtex-product-summary-2-x-nameContainer span.vtex-product-summary-2-x-productBrand"
+SELECTOR_PRECIOS = "div.pr0.items-stretch.flex span.diaio-store-5-x-sellingPriceValue"
+
+# Devuelve [[nombre, precio], ...]; el filtro por nombre sólo aplica a "felices las vacas"
+JS_EXTRAER_PRODUCTOS = """
+([selectorNombres, selectorPrecios, marca]) => {
+    const nombres = [...document.querySelectorAll(selectorNombres)].map(e => e.innerText.trim());
+    const precios = [...document.querySelectorAll(selectorPrecios)].map(e => e.innerText.trim());
+    const productos = [];
+    for (let i = 0; i < Math.min(nombres.length, precios.length); i++) {
+        if (marca.toLowerCase() === "felices las vacas"
+            && !nombres[i].toLowerCase().includes("felices las vacas")) {
+            continue;
+        }
+        productos.push([nombres[i], precios[i]]);
+    }
+    return productos;
+}
+"""
+
+async def scrape_dia(marca, pool=None, resultados=None):
     url = f"https://diaonline.supermercadosdia.com.ar/{marca.lower()}?_q={marca}&map=ft"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ))
-        page = await context.new_page()
-        await page.goto(url)
-
-        viewport_height = await page.evaluate("window.innerHeight")
-        scroll_height = await page.evaluate("document.body.scrollHeight")
-        scroll_position = 0
-        while scroll_position < scroll_height:
-            scroll_position += viewport_height // 2
-            await page.evaluate(f"window.scrollTo(0, {scroll_position})")
-            await asyncio.sleep(1)
-            scroll_height = await page.evaluate("document.body.scrollHeight")
+    async with abrir_pagina(pool, "dia", user_agent=USER_AGENT) as page:
+        with span("goto", pagina=1):
+            await page.goto(url)
 
-        await page.wait_for_selector("div.vtex-product-summary-2-x-nameContainer span.vtex-product-summary-2-x-productBrand", timeout=30000)
-
-        productos = await page.query_selector_all("div.vtex-product-summary-2-x-nameContainer span.vtex-product-summary-2-x-productBrand")
-        precios = await page.query_selector_all("div.pr0.items-stretch.flex span.diaio-store-5-x-sellingPriceValue")
+        with span("scroll", pagina=1):
+            viewport_height = await page.evaluate("window.innerHeight")
+            scroll_height = await page.evaluate("document.body.scrollHeight")
+            scroll_position = 0
+            while scroll_position < scroll_height:
+                scroll_position += viewport_height // 2
+                await page.evaluate(f"window.scrollTo(0, {scroll_position})")
+                await esperar_grilla_estable(page, SELECTOR_NOMBRES, timeout=1000, quietud_ms=300, minimo=0)
+                scroll_height = await page.evaluate("document.body.scrollHeight")
 
-        all_productos = []
-        for i in range(min(len(productos), len(precios))):
-            nombre = (await productos[i].inner_text()).strip()
-            precio = (await precios[i].inner_text()).strip()
+        with span("wait", pagina=1):
+            await page.wait_for_selector(SELECTOR_NOMBRES, timeout=30000)
 
-            # Filtro condicional solo para "felices las vacas"
-            if marca.lower() == "felices las vacas":
-                if "felices las vacas" not in nombre.lower():
-                    continue  # Ignorar producto que no menciona la marca
+        # Nombres y precios en una sola llamada, emparejados por posición
+        with span("extract", pagina=1) as s:
+            productos = await page.evaluate(JS_EXTRAER_PRODUCTOS, [SELECTOR_NOMBRES, SELECTOR_PRECIOS, marca])
+            s["productos"] = len(productos)
 
-            all_productos.append({"nombre": nombre, "precio": precio})
+        all_productos = [] if resultados is None else resultados
+        all_productos.extend({"nombre": nombre, "precio": precio} for nombre, precio in productos)
 
-        await browser.close()
     return all_productos
 
 if __name__ == "__main__":
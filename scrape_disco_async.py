@@ -1,56 +1,107 @@
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import abrir_contexto
+from metrics import contar, span
+from page_ready import esperar_grilla_estable, huella_grilla
+from url_pagination import PESTANIAS, con_pagina, leer_paginas, total_paginas
 
-async def scrape_disco(busqueda, max_pages=5):
-    url = f"https://www.disco.com.ar/{busqueda}?_q={busqueda}&map=ft"
-    productos = []
+SELECTOR_PRODUCTOS = "a.vtex-product-summary-2-x-clearLink"
+SELECTOR_PAGINACION = "button[value]"
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(url)
-        await page.wait_for_selector("a.vtex-product-summary-2-x-clearLink", timeout=40000)
-
-        for pagina in range(1, max_pages + 1):
-            previous_height = 0
-            while True:
-                await page.evaluate("window.scrollBy(0, 1000)")
-                await asyncio.sleep(1)
-                current_height = await page.evaluate("document.body.scrollHeight")
-                if current_height == previous_height:
-                    break
-                previous_height = current_height
-
-            productos_raw = await page.query_selector_all("a.vtex-product-summary-2-x-clearLink")
-            for producto in productos_raw:
-                nombre_elem = await producto.query_selector("span.vtex-product-summary-2-x-productBrand")
-                nombre = (await nombre_elem.inner_text()).strip() if nombre_elem else ""
-
-                if busqueda.lower() not in nombre.lower():
-                    continue
-
-                precio_elem = await producto.query_selector("#priceContainer")
-                if precio_elem:
-                    precio = (await precio_elem.inner_text()).strip()
-                else:
-                    precio = "Sin precio"
-
-                productos.append({
-                    "nombre": nombre,
-                    "precio": precio
-                })
-
-            siguiente_pagina_num = pagina + 1
-            boton_siguiente = await page.query_selector(f'button[value="{siguiente_pagina_num}"]')
-
-            if boton_siguiente:
-                await boton_siguiente.click()
-                await page.wait_for_timeout(4000)
-                await page.wait_for_selector("a.vtex-product-summary-2-x-clearLink", timeout=40000)
-            else:
+# Devuelve [[nombre, precio], ...] de las tarjetas cuyo nombre contiene la búsqueda
+JS_EXTRAER_PRODUCTOS = """
+([selector, busqueda]) => {
+    const productos = [];
+    for (const tarjeta of document.querySelectorAll(selector)) {
+        const nombreEl = tarjeta.querySelector("span.vtex-product-summary-2-x-productBrand");
+        const nombre = nombreEl ? nombreEl.innerText.trim() : "";
+        if (!nombre.toLowerCase().includes(busqueda.toLowerCase())) {
+            continue;
+        }
+        const precioEl = tarjeta.querySelector("#priceContainer");
+        productos.push([nombre, precioEl ? precioEl.innerText.trim() : "Sin precio"]);
+    }
+    return productos;
+}
+"""
+
+async def scroll_hasta_el_final(page, pagina):
+    with span("scroll", pagina=pagina):
+        previous_height = 0
+        while True:
+            await page.evaluate("window.scrollBy(0, 1000)")
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=1000, quietud_ms=300)
+            current_height = await page.evaluate("document.body.scrollHeight")
+            if current_height == previous_height:
                 break
+            previous_height = current_height
+
+async def extraer(page, busqueda, pagina):
+    """Productos de la página ya cargada en `page`"""
+    await scroll_hasta_el_final(page, pagina)
+    # Nombre y precio de todas las tarjetas de la marca en una sola llamada
+    with span("extract", pagina=pagina) as s:
+        productos_pagina = await page.evaluate(JS_EXTRAER_PRODUCTOS, [SELECTOR_PRODUCTOS, busqueda])
+        s["productos"] = len(productos_pagina)
+    return [{"nombre": nombre, "precio": precio} for nombre, precio in productos_pagina]
+
+async def leer_pagina(page, url, pagina, busqueda):
+    with span("goto", pagina=pagina):
+        await page.goto(url)
+    with span("wait", pagina=pagina):
+        await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+    return await extraer(page, busqueda, pagina)
+
+async def paginar_con_clicks(page, busqueda, desde, max_pages, productos=None):
+    """Recorre las páginas `desde`..`max_pages` con los botones del paginador, a partir de la abierta en
+    `page`, y agrega los productos de cada una a `productos` apenas la lee"""
+    productos = [] if productos is None else productos
+    for pagina in range(desde, max_pages + 1):
+        boton_siguiente = await page.query_selector(f'button[value="{pagina}"]')
+        if not boton_siguiente:
+            break
+        with span("paginar", pagina=pagina):
+            huella = await huella_grilla(page, SELECTOR_PRODUCTOS)
+            await boton_siguiente.click()
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, distinto_de=huella)
+            await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
+        productos.extend(await extraer(page, busqueda, pagina))
+    return productos
+
+async def scrape_disco(busqueda, max_pages=5, pool=None, resultados=None, pestanias=PESTANIAS):
+    """Lee la primera página, toma del paginador la cantidad de páginas y carga el resto por URL
+    (`&page=N`) de a `pestanias` a la vez; si alguna no se puede leer así, vuelve a los clics"""
+    url = f"https://www.disco.com.ar/{busqueda}?_q={busqueda}&map=ft"
+    productos = [] if resultados is None else resultados
+
+    async with abrir_contexto(pool, "disco") as context:
+        page = await context.new_page()
+        try:
+            primera = await leer_pagina(page, url, 1, busqueda)
+            productos.extend(primera)
+            total = min(await total_paginas(page, SELECTOR_PAGINACION), max_pages)
+            if total > 1:
+                # Cada página se agrega en orden apenas están todas las anteriores; una que no cargó, o
+                # igual a la primera (el sitio ignoró el parámetro), invalida el resto de la tanda
+                inicio = len(productos)
+                valida = True
+
+                def agregar(numero, leida):
+                    nonlocal valida
+                    valida = valida and leida is not None and (not primera or leida != primera)
+                    if valida:
+                        productos.extend(leida)
 
-        await browser.close()
+                await leer_paginas(
+                    context, range(2, total + 1),
+                    lambda p, n: leer_pagina(p, con_pagina(url, n), n, busqueda), pestanias, al_leer=agregar)
+                if not valida:
+                    print("⚠️ disco: la paginación por URL falló, se recorre con el paginador")
+                    contar("reintentos", motivo="paginacion_clicks")
+                    del productos[inicio:]  # Sólo lo que agregaron las páginas por URL
+                    await paginar_con_clicks(page, busqueda, 2, max_pages, productos)
+        finally:
+            if not page.is_closed():
+                await asyncio.shield(page.close())
 
     return productos
 
@@ -1,17 +1,40 @@
 import asyncio
-from playwright.async_api import async_playwright
+from browser_pool import abrir_pagina
+from metrics import span
+from page_ready import esperar_grilla_estable
 
-async def scrape_vea_all_pages(busqueda):
+SELECTOR_PRODUCTOS = "div.vtex-product-summary-2-x-nameContainer"
+
+# Devuelve [[nombre, precio], ...] de los productos cuyo nombre contiene la búsqueda;
+# el precio se busca en la <section> que contiene al nombre
+JS_EXTRAER_PRODUCTOS = """
+([selector, busqueda]) => {
+    const productos = [];
+    for (const productoDiv of document.querySelectorAll(selector)) {
+        const nombreEl = productoDiv.querySelector("span.vtex-product-summary-2-x-productBrand");
+        const nombre = nombreEl ? nombreEl.innerText.trim() : "Sin nombre";
+        if (!nombre.toLowerCase().includes(busqueda.toLowerCase())) {
+            continue;
+        }
+        const contenedor = productoDiv.closest("section");
+        const precioEl = contenedor ? contenedor.querySelector("div#priceContainer") : null;
+        productos.push([nombre, precioEl ? precioEl.innerText.trim() : "Sin precio"]);
+    }
+    return productos;
+}
+"""
+
+async def scrape_vea_all_pages(busqueda, pool=None, resultados=None):
     url = f"https://www.vea.com.ar/{busqueda}?_q={busqueda}&map=ft"
-    productos = []
+    productos = [] if resultados is None else resultados
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+    async with abrir_pagina(pool, "vea") as page:
         print(f"Abriendo URL: {url}")
-        await page.goto(url)
+        with span("goto", pagina=1):
+            await page.goto(url)
 
-        await page.wait_for_selector("div.vtex-product-summary-2-x-nameContainer", timeout=40000)
+        with span("wait", pagina=1):
+            await page.wait_for_selector(SELECTOR_PRODUCTOS, timeout=40000)
 
         async def scroll_to_bottom():
             last_count = 0
@@ -20,10 +43,10 @@ async def scrape_vea_all_pages(busqueda):
 
             while True:
                 await page.evaluate(f"window.scrollTo(0, {scroll_position});")
-                await page.wait_for_timeout(1000)
+                await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=1000, quietud_ms=300)
                 scroll_position += 500
 
-                current_count = len(await page.query_selector_all("div.vtex-product-summary-2-x-nameContainer"))
+                current_count = await page.locator(SELECTOR_PRODUCTOS).count()
                 
                 if current_count == last_count:
                     retries += 1
@@ -33,34 +56,21 @@ async def scrape_vea_all_pages(busqueda):
                     retries = 0
                     last_count = current_count
 
-        await scroll_to_bottom()
-        await page.wait_for_timeout(2000)
-
-        productos_en_pagina = await page.query_selector_all("div.vtex-product-summary-2-x-nameContainer")
+        with span("scroll", pagina=1):
+            await scroll_to_bottom()
+            await esperar_grilla_estable(page, SELECTOR_PRODUCTOS, timeout=2000)
 
-        for producto_div in productos_en_pagina:
-            nombre_span = await producto_div.query_selector("span.vtex-product-summary-2-x-productBrand")
-            nombre = await nombre_span.inner_text() if nombre_span else "Sin nombre"
-            nombre = nombre.strip()
-
-            if busqueda.lower() not in nombre.lower():
-                continue
-
-            contenedor = await producto_div.evaluate_handle("node => node.closest('section')")
-            if contenedor:
-                precio_elem = await contenedor.query_selector("div#priceContainer")
-                precio = await precio_elem.inner_text() if precio_elem else "Sin precio"
-                precio = precio.strip()
-            else:
-                precio = "Sin precio"
+        # Nombre y precio de todos los productos de la marca en una sola llamada
+        with span("extract", pagina=1) as s:
+            productos_en_pagina = await page.evaluate(JS_EXTRAER_PRODUCTOS, [SELECTOR_PRODUCTOS, busqueda])
+            s["productos"] = len(productos_en_pagina)
 
+        for nombre, precio in productos_en_pagina:
             productos.append({
                 "nombre": nombre,
                 "precio": precio
             })
 
-        await browser.close()
-
     return productos
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+import asyncio
+import importlib.util
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from html.parser import HTMLParser
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location("bench_scrapers", os.path.join(RAIZ, "benchmarks", "bench_scrapers.py"))
+bench = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench)
+
+# URL con la que arranca cada scraper y la clase de los elementos con el nombre del producto
+INICIO = {
+    "carrefour": ("https://www.carrefour.com.ar/Not?_q=Not&map=ft&page=1", "vtex-product-summary-2-x-productBrand"),
+    "coope": ("https://www.lacoopeencasa.coop/", None),
+    "coto": ("https://www.cotodigital.com.ar/sitios/cdigi/categoria?_dyncharset=utf-8&Dy=1&Ntt=Not&idSucursal=200",
+             "nombre-producto"),
+    "dia": ("https://diaonline.supermercadosdia.com.ar/not?_q=Not&map=ft", "vtex-product-summary-2-x-productBrand"),
+    "disco": ("https://www.disco.com.ar/Not?_q=Not&map=ft", "vtex-product-summary-2-x-productBrand"),
+    "vea": ("https://www.vea.com.ar/Not?_q=Not&map=ft", "vtex-product-summary-2-x-productBrand"),
+}
+
+
+class Clases(HTMLParser):
+    """Cuenta las clases CSS de un HTML"""
+
+    def __init__(self):
+        super().__init__()
+        self.clases = Counter()
+
+    def handle_starttag(self, tag, attrs):
+        for nombre, valor in attrs:
+            if nombre == "class" and valor:
+                self.clases.update(valor.split())
+
+
+def clases(ruta):
+    parser = Clases()
+    with open(ruta, encoding="utf-8") as f:
+        parser.feed(f.read())
+    return parser.clases
+
+
+def indice(tienda):
+    with open(os.path.join(bench.FIXTURES_PATH, "not", tienda, bench.ARCHIVO_INDICE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Request:
+    def __init__(self, url, method="GET", resource_type="document", post_data=None):
+        self.url = url
+        self.method = method
+        self.resource_type = resource_type
+        self.post_data = post_data
+
+
+class Route:
+    def __init__(self, request):
+        self.request = request
+        self.abortado = None
+        self.respuesta = None
+
+    async def abort(self, motivo):
+        self.abortado = motivo
+
+    async def fulfill(self, **respuesta):
+        self.respuesta = respuesta
+
+
+def test_hay_fixtures_para_cada_tienda():
+    assert set(INICIO) == set(bench.SUPERMERCADOS)
+    for tienda, (url, clase) in INICIO.items():
+        entradas = indice(tienda)
+        assert f"GET {url}" in entradas, tienda
+        directorio = os.path.join(bench.FIXTURES_PATH, "not", tienda)
+        archivos = {e["archivo"] for e in entradas.values()}
+        assert archivos == set(os.listdir(directorio)) - {bench.ARCHIVO_INDICE}, tienda
+        for clave, entrada in entradas.items():
+            assert clave == f"GET {entrada['url']}"
+            assert entrada["status"] == 200
+        if clase:
+            assert clases(os.path.join(directorio, entradas[f"GET {url}"]["archivo"]))[clase] > 0, tienda
+
+    # La Coope busca desde el inicio con el formulario y pagina con ?pagina=N
+    coope = indice("coope")
+    assert "idInputBusqueda" in open(os.path.join(bench.FIXTURES_PATH, "not", "coope", "inicio.html"),
+                                     encoding="utf-8").read()
+    listado = "https://www.lacoopeencasa.coop/listado/busqueda-avanzada?termino=Not"
+    assert {f"GET {listado}", f"GET {listado}&pagina=2"} <= set(coope)
+
+
+def test_clave_pedido():
+    assert bench.clave_pedido(Request("https://www.disco.com.ar/Not")) == "GET https://www.disco.com.ar/Not"
+    con_cuerpo = bench.clave_pedido(Request("https://www.disco.com.ar/graphql", "POST", post_data='{"page": 1}'))
+    assert con_cuerpo.startswith("POST https://www.disco.com.ar/graphql ")
+    assert con_cuerpo != bench.clave_pedido(Request("https://www.disco.com.ar/graphql", "POST", post_data='{"page": 2}'))
+
+
+def test_servidor_fixtures_sirve_los_archivos_con_latencia():
+    ruta = os.path.join(bench.FIXTURES_PATH, "not", "dia", "pagina_1.html")
+    with bench.ServidorFixtures(latencia_ms=50) as servidor:
+        inicio = time.perf_counter()
+        assert bench._descargar(f"{servidor.url}/not/dia/pagina_1.html") == open(ruta, "rb").read()
+        assert time.perf_counter() - inicio >= 0.05
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{servidor.url}/not/dia/no_existe.html")
+        assert error.value.code == 404
+
+
+def test_responder_sirve_bloquea_y_cuenta_faltantes():
+    async def responder(pool, url, **kwargs):
+        route = Route(Request(url, **kwargs))
+        await pool.responder("disco", route)
+        return route
+
+    async def correr():
+        with bench.ServidorFixtures() as servidor:
+            pool = bench.PoolBench("not", servidor)
+            servida = await responder(pool, "https://www.disco.com.ar/Not?_q=Not&map=ft&page=2")
+            faltante = await responder(pool, "https://www.disco.com.ar/Not?_q=Not&map=ft&page=3")
+            imagen = await responder(pool, "https://discoar.vtexassets.com/foto.jpg", resource_type="image")
+            tracker = await responder(pool, "https://www.google-analytics.com/collect", resource_type="script")
+            return pool, servida, faltante, imagen, tracker
+
+    pool, servida, faltante, imagen, tracker = asyncio.run(correr())
+    with open(os.path.join(bench.FIXTURES_PATH, "not", "disco", "pagina_2.html"), "rb") as f:
+        assert servida.respuesta == {"status": 200, "body": f.read(),
+                                     "headers": {"content-type": "text/html; charset=utf-8"}}
+    assert faltante.respuesta == {"status": 404, "body": ""}
+    assert imagen.abortado == tracker.abortado == "blockedbyclient"
+    assert imagen.respuesta is None and tracker.respuesta is None
+    assert pool.pedidos == Counter(servidos=1, faltantes=1, bloqueados=2)
+
+
+class Elemento:
+    async def inner_text(self):
+        return "Not Burger 2 Un"
+
+
+class Pagina:
+    def __init__(self):
+        self.url = "https://www.vea.com.ar/Not?_q=Not&map=ft"
+
+    async def query_selector_all(self, selector):
+        return [Elemento(), Elemento()]
+
+    def locator(self, selector):
+        return Elemento()
+
+
+Elemento.__module__ = Pagina.__module__ = "playwright.async_api._generated"
+
+
+def test_instrumentado_cuenta_las_llamadas_encadenadas():
+    llamadas = Counter()
+    page = bench.Instrumentado(Pagina(), llamadas)
+
+    async def usar():
+        elementos = await page.query_selector_all("div")
+        return [await e.inner_text() for e in elementos] + [await page.locator("h1").inner_text()]
+
+    assert asyncio.run(usar()) == ["Not Burger 2 Un"] * 3
+    assert page.url == "https://www.vea.com.ar/Not?_q=Not&map=ft"
+    assert llamadas == Counter({"Pagina.query_selector_all": 1, "Pagina.locator": 1, "Elemento.inner_text": 3})
+
+
+def test_medir_tienda_y_guardar_resultados(monkeypatch, tmp_path):
+    async def scraper(marca, pool):
+        # Lo que haría el navegador al abrir la primera página de Dia
+        route = Route(Request(INICIO["dia"][0]))
+        await pool.responder("dia", route)
+        pool.paginas += 1
+        print("no se muestra")
+        assert b"Not Chicken Mila 220 Gr" in route.respuesta["body"]
+        return [{"nombre": "Not Burger 2 Un", "precio": "$ 3.049"}] * 3
+
+    async def falla(marca, pool):
+        raise RuntimeError("sin grilla")
+
+    monkeypatch.setattr(bench, "SUPERMERCADOS", {"dia": (scraper, None), "vea": (falla, None)})
+
+    async def correr():
+        with bench.ServidorFixtures() as servidor:
+            pool = bench.PoolBench("not", servidor)
+            return [await bench.medir_tienda(pool, tienda, "Not", True) for tienda in ("dia", "vea")]
+
+    dia, vea = asyncio.run(correr())
+    assert {k: dia[k] for k in ("tienda", "paginas", "productos", "pedidos", "error")} == {
+        "tienda": "dia", "paginas": 1, "productos": 3, "pedidos": {"servidos": 1}, "error": None}
+    assert dia["productos_por_segundo"] > 0
+    assert vea["error"] == "RuntimeError('sin grilla')" and vea["productos"] == 0 and vea["pedidos"] == {}
+
+    salida = tmp_path / "resultados" / "bench_scrapers.jsonl"
+    comunes = {"commit": "abc1234", "fecha": "2026-10-18T10:00:00", "marca": "Not", "latencia_ms": 0}
+    bench.guardar_resultados([dia], str(salida), comunes)
+    bench.guardar_resultados([vea], str(salida), comunes)
+    lineas = [json.loads(linea) for linea in salida.read_text(encoding="utf-8").splitlines()]
+    assert lineas == [{**comunes, **dia}, {**comunes, **vea}]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import urllib.parse
+from contextlib import asynccontextmanager
+
+from vtex_search import capturar_pagina, capturar_vtex, productos_en_respuesta
+
+# Respuestas de búsqueda que pide el storefront: GraphQL de VTEX IO (productSearchV3, una por
+# página) e Intelligent Search (sólo los campos que se leen)
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "vtex")
+URL_GRAPHQL = "https://www.disco.com.ar/_v/segment/graphql/v1?workspace=master&operationName=productSearchV3"
+URL_INTELLIGENT_SEARCH = "https://www.disco.com.ar/_v/api/intelligent-search/product_search/trade-policy/1?query=not"
+
+
+def cargar(nombre):
+    with open(os.path.join(FIXTURES, f"{nombre}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Respuesta:
+    def __init__(self, url, datos):
+        self.url = url
+        self._datos = datos
+
+    async def json(self):
+        if isinstance(self._datos, Exception):
+            raise self._datos
+        return self._datos
+
+
+class Pagina:
+    """Pestaña falsa: al navegar emite las respuestas de `respuestas(url)` a los handlers de "response" """
+
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.handlers = []
+        self.visitadas = []
+        self.cerrada = False
+
+    def on(self, evento, handler):
+        assert evento == "response"
+        self.handlers.append(handler)
+
+    async def goto(self, url, wait_until=None):
+        self.visitadas.append(url)
+        for respuesta in self.respuestas(url):
+            for handler in self.handlers:
+                asyncio.ensure_future(handler(respuesta))
+
+    def is_closed(self):
+        return self.cerrada
+
+    async def close(self):
+        self.cerrada = True
+
+
+def respuestas_storefront(url):
+    """Lo que ve la pestaña al abrir una página de resultados: ruido y la búsqueda GraphQL de esa página"""
+    pagina = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("page", ["1"])[0]
+    return [
+        Respuesta("https://www.disco.com.ar/analytics/collect", {"products": [{"productName": "Ruido"}]}),
+        Respuesta(URL_GRAPHQL + "&extensions=facets", ValueError("no es JSON")),
+        Respuesta(URL_GRAPHQL + "&extensions=vacia", {"data": {"productSearch": {"products": []}}}),
+        Respuesta(URL_GRAPHQL, cargar(f"captura_graphql_{pagina}")),
+    ]
+
+
+class Contexto:
+    def __init__(self, respuestas):
+        self.respuestas = respuestas
+        self.paginas = []
+
+    async def new_page(self):
+        self.paginas.append(Pagina(self.respuestas))
+        return self.paginas[-1]
+
+
+class Pool:
+    def __init__(self, respuestas):
+        self.context = Contexto(respuestas)
+
+    @asynccontextmanager
+    async def contexto(self, tienda, **opciones):
+        yield self.context
+
+
+def test_productos_en_respuesta_segun_el_formato():
+    productos, total = productos_en_respuesta(cargar("captura_graphql_1"))
+    assert [p["productName"] for p in productos][:2] == ["Not Burger 2 Un", "Not Milk Original 1 Lt"]
+    assert total == 5
+
+    productos, total = productos_en_respuesta(cargar("captura_intelligent_search"))
+    assert [p["productName"] for p in productos] == ["Not Cheese Dambo 140 Gr", "Not Chicken Mila 220 Gr"]
+    assert total == 2
+
+    catalogo = cargar("disco_not_50-99")  # La API REST del catálogo devuelve la lista sola
+    assert productos_en_respuesta(catalogo) == (catalogo, None)
+    assert productos_en_respuesta({"data": {"productSearch": None}}) == ([], None)
+
+
+def test_capturar_pagina_toma_la_primera_busqueda_con_productos():
+    async def capturar():
+        page = Pagina(lambda url: [
+            Respuesta(URL_INTELLIGENT_SEARCH + "&count=0", {"products": [], "recordsFiltered": 0}),
+            Respuesta(URL_INTELLIGENT_SEARCH, cargar("captura_intelligent_search")),
+            Respuesta(URL_GRAPHQL, cargar("captura_graphql_1")),
+        ])
+        return await capturar_pagina(page, "https://www.disco.com.ar/not?_q=Not&map=ft", 1)
+
+    productos, total = asyncio.run(capturar())
+    assert [p["productName"] for p in productos] == ["Not Cheese Dambo 140 Gr", "Not Chicken Mila 220 Gr"]
+    assert total == 2
+
+
+def test_capturar_vtex_lee_las_paginas_siguientes_del_total():
+    pool = Pool(respuestas_storefront)
+    resultados = asyncio.run(capturar_vtex("disco", "Not", pool=pool))
+
+    # 5 resultados de a 3 por página: se abre también la página 2, en su propia pestaña
+    visitadas = [url for page in pool.context.paginas for url in page.visitadas]
+    assert visitadas == ["https://www.disco.com.ar/not?_q=Not&map=ft",
+                         "https://www.disco.com.ar/not?_q=Not&map=ft&page=2"]
+    assert all(page.is_closed() for page in pool.context.paginas)
+
+    # Sin otras marcas ni repetidos, con los precios y el SKU del JSON
+    assert resultados == [
+        {"nombre": "Not Burger 2 Un", "precio": "$3.150,00", "sku": "2001", "precio_lista": 3150.0,
+         "precio_venta": 3150.0},
+        {"nombre": "Not Milk Original 1 Lt", "precio": "$2.890,50", "sku": "2002", "precio_lista": 3400.0,
+         "precio_venta": 2890.5},
+        {"nombre": "Not Mayo Original 350 Gr", "precio": "$1.999,99", "sku": "2004", "precio_lista": 1999.99,
+         "precio_venta": 1999.99},
+    ]
@@ -0,0 +1,93 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vtex_search import SEARCH_PATH, buscar_vtex, formatear_precio
+
+# Respuestas de la API de catálogo de Disco para "Not" (sólo los campos que se leen), una por rango _from-_to
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "vtex")
+
+
+def cargar_paginas():
+    paginas = {}
+    for ruta in glob.glob(os.path.join(FIXTURES, "disco_not_*.json")):
+        desde = int(os.path.basename(ruta)[len("disco_not_"):].split("-")[0])
+        with open(ruta, encoding="utf-8") as f:
+            paginas[desde] = json.load(f)
+    return paginas
+
+
+@pytest.fixture
+def servidor():
+    """Sirve las páginas de FIXTURES como la API de catálogo; anota cada pedido en `servidor.pedidos`"""
+    paginas = cargar_paginas()
+    total = sum(len(p) for p in paginas.values())
+
+    class Catalogo(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            query = urllib.parse.parse_qs(url.query)
+            desde, hasta = int(query["_from"][0]), int(query["_to"][0])
+            self.server.pedidos.append((url.path, query["ft"][0], desde, hasta))
+            cuerpo = json.dumps(paginas.get(desde, [])).encode("utf-8")
+            self.send_response(206)
+            if self.server.con_total:
+                self.send_header("resources", f"{desde}-{hasta}/{total}")
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Catalogo)
+    srv.pedidos = []
+    srv.con_total = True
+    srv.url = f"http://127.0.0.1:{srv.server_port}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_formatear_precio():
+    assert formatear_precio(1234.5) == "$1.234,50"
+    assert formatear_precio(999) == "$999,00"
+    assert formatear_precio(1234567.891) == "$1.234.567,89"
+    assert formatear_precio(0) == "Sin precio"
+    assert formatear_precio(None) == "Sin precio"
+
+
+def test_buscar_vtex_pagina_y_filtra_la_marca(servidor):
+    resultados = asyncio.run(buscar_vtex("disco", "Not", base_url=servidor.url))
+
+    # Con el total del header, las páginas de 50 se piden por rango _from/_to
+    assert sorted(servidor.pedidos) == [(SEARCH_PATH, "Not", 0, 49), (SEARCH_PATH, "Not", 50, 99)]
+
+    nombres = [p["nombre"] for p in resultados]
+    assert len(resultados) == 46
+    assert all("not" in nombre.lower() for nombre in nombres)  # Sin Silk, Vegetalex, etc.
+    assert len(set(nombres)) == len(nombres)  # El repetido de la segunda página no se duplica
+
+    precios = {p["nombre"]: p for p in resultados}
+    assert resultados[0] == {"nombre": "Not Burger 2 Un", "precio": "$1.234,50", "sku": "1001",
+                             "precio_lista": 1234.5, "precio_venta": 1234.5}
+    cheddar = precios["Not Cheese Cheddar 140 Gr"]  # Con descuento: lista y venta por separado
+    assert (cheddar["precio"], cheddar["precio_lista"], cheddar["precio_venta"]) == ("$1.331,75", 1599.0, 1331.75)
+    assert precios["Not Chicken Mila 220 Gr"]["precio"] == "$1.526,25"  # Vendedor por defecto, no el primero
+    assert precios["Not Milk Original 1 Lt"]["precio"] == "Sin precio"  # Precio 0: sin stock
+    assert precios["Not Burger 2 Un Pack x3"]["precio"] == "Sin precio"  # Sin SKUs
+
+
+def test_buscar_vtex_sin_total_pagina_mientras_haya_paginas_llenas(servidor):
+    servidor.con_total = False
+    resultados = asyncio.run(buscar_vtex("disco", "Not", base_url=servidor.url))
+
+    assert servidor.pedidos == [(SEARCH_PATH, "Not", 0, 49), (SEARCH_PATH, "Not", 50, 99)]
+    assert len(resultados) == 46
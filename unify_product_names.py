@@ -1,10 +1,18 @@
 import pandas as pd
-from fuzzywuzzy import fuzz
 import numpy as np
 import re
 import os
+import io
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from datetime import datetime
 
+from history_store import agregar_dia, HISTORY_PATH
+from price_aggregates import actualizar as actualizar_agregados
+from delta_store import DELTAS_PATH, leer_deltas, registrar_dias
+from product_matcher import ProductMatcher
+
 pd.set_option('display.max_colwidth', 200)
 
 def parse_price(price):
@@ -20,17 +28,52 @@ def parse_price(price):
     except ValueError:
         return np.nan
 
-def unify_products(input_filepath, output_directory, product_column, supermarket_columns, unification_map):
+def parse_price_series(prices):
+    """Vectorized parse_price: returns (parsed float64 Series, number of non-null cells that could not be parsed)"""
+    present = prices.notna()
+    price_str = (
+        prices[present].astype(str)
+        .str.replace('$', '', regex=False)
+        .str.replace('.', '', regex=False)
+        .str.strip()
+        .str.replace(',', '.', regex=False)
+    )
+    parsed = pd.Series(np.nan, index=prices.index, dtype='float64')
+    parsed[present] = pd.to_numeric(price_str, errors='coerce')
+    unparseable = int((present & parsed.isna()).sum())
+    return parsed, unparseable
+
+def parse_raw_filename(filename):
+    """Devuelve (fecha, marca) de un nombre precios_async_AAAA-MM-DD_marca.csv, o None"""
+    match = re.match(r'precios_async_(\d{4}-\d{2}-\d{2})_(\w+)\.csv', os.path.basename(filename))
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+def aggregate_unified(df, product_column, supermarket_columns):
+    """One row per producto_unificado: first non-null price per supermarket, plus the
+    fecha and product name of the group's first row (vectorized groupby.first)"""
+    grouped = df.groupby('producto_unificado', sort=True)
+    prices = grouped[supermarket_columns].first()
+    first_rows = (
+        df.drop_duplicates('producto_unificado')
+        .set_index('producto_unificado')[['fecha', product_column]]
+        .rename(columns={product_column: 'producto_representativo'})
+    )
+    unified_df = prices.join(first_rows).reset_index()
+    return unified_df[['fecha', 'producto_unificado', 'producto_representativo'] + supermarket_columns]
+
+def unify_products(input_filepath, output_directory, product_column, supermarket_columns, unification_map,
+                   export_csv=True, matcher=None, verbose=True):
     # Extract brand and date from the input filename
     filename = os.path.basename(input_filepath)
-    match = re.match(r'precios_async_(\d{4}-\d{2}-\d{2})_(\w+)\.csv', filename)
+    parsed = parse_raw_filename(filename)
     
-    if not match:
+    if not parsed:
         print(f"Error: El nombre del archivo de entrada '{filename}' no sigue el formato esperado (precios_async_AAAA-MM-DD_marca.csv).")
         return
 
-    date_str = match.group(1)
-    brand = match.group(2)
+    date_str, brand = parsed
 
     if not os.path.exists(input_filepath):
         print(f"Error: El archivo '{input_filepath}' no se encontró en la ruta especificada.")
@@ -41,12 +84,24 @@ def unify_products(input_filepath, output_directory, product_column, supermarket
     # Add 'fecha' column
     df['fecha'] = date_str 
 
-    reverse_unification_map = {}
-    for canonical_name, variants in unification_map.items():
-        for variant in variants:
-            reverse_unification_map[variant] = canonical_name
+    if matcher is not None:
+        # Mapa exacto primero; los nombres nuevos se resuelven por similitud (y quedan en caché)
+        known = set(matcher.cache)
+        resolved = matcher.resolve_many(df[product_column].unique())
+        df['producto_unificado'] = df[product_column].map(resolved).fillna(df[product_column])
+        new_matches = {raw: matcher.cache[raw] for raw in resolved if raw in matcher.cache and raw not in known}
+        if new_matches:
+            accepted = {raw: name for raw, name in new_matches.items() if name}
+            print(f"Nombres nuevos: {len(new_matches)}, asociados por similitud: {len(accepted)}")
+            for raw, name in sorted(accepted.items()):
+                print(f"  '{raw}' -> '{name}'")
+    else:
+        reverse_unification_map = {}
+        for canonical_name, variants in unification_map.items():
+            for variant in variants:
+                reverse_unification_map[variant] = canonical_name
 
-    df['producto_unificado'] = df[product_column].map(reverse_unification_map).fillna(df[product_column])
+        df['producto_unificado'] = df[product_column].map(reverse_unification_map).fillna(df[product_column])
 
     existing_supermarket_cols = [col for col in supermarket_columns if col in df.columns]
 
@@ -58,34 +113,51 @@ def unify_products(input_filepath, output_directory, product_column, supermarket
         print("Aquí tienes una vista del DataFrame con 'producto_unificado':")
         print(df[[product_column, 'producto_unificado']].head(20).to_string())
     else:
+        unparseable_counts = {}
         for col in existing_supermarket_cols:
-            df[col] = df[col].apply(parse_price)
+            df[col], unparseable_counts[col] = parse_price_series(df[col])
 
-        agg_funcs = {
-            col: (col, lambda x: x.dropna().iloc[0] if not x.dropna().empty else np.nan)
-            for col in existing_supermarket_cols
-        }
-        
-        agg_funcs['fecha'] = ('fecha', lambda x: x.iloc[0]) 
-        agg_funcs['producto_representativo'] = (product_column, lambda x: x.iloc[0])
+        unparseable_total = sum(unparseable_counts.values())
+        if unparseable_total:
+            detail = ", ".join(f"{col}: {n}" for col, n in unparseable_counts.items() if n)
+            print(f"Precios no parseables ({unparseable_total}): {detail}")
 
-        unified_df = df.groupby('producto_unificado', as_index=False).agg(**agg_funcs)
-        unified_df = unified_df[['fecha', 'producto_unificado', 'producto_representativo'] + existing_supermarket_cols]
+        unified_df = aggregate_unified(df, product_column, existing_supermarket_cols)
         
-        print("\n--- Vista Previa de Productos Unificados (Primeras 20 Filas) ---")
-        print(unified_df.head(20).to_string())
+        if verbose:
+            print("\n--- Vista Previa de Productos Unificados (Primeras 20 Filas) ---")
+            print(unified_df.head(20).to_string())
 
         print(f"\nNúmero total de productos únicos antes de unificar: {df[product_column].nunique()}")
         print(f"Número total de productos unificados: {unified_df['producto_unificado'].nunique()}")
         
-        # Create output directory if it doesn't exist
-        os.makedirs(output_directory, exist_ok=True)
-        
-        output_filename = f'productos_{brand}_unificados_{date_str}.csv'
-        output_filepath = os.path.join(output_directory, output_filename)
-        
-        unified_df.to_csv(output_filepath, index=False)
-        print(f"\nProceso de unificación completado. Resultados guardados en '{output_filepath}'.")
+        if export_csv:
+            export_unified(unified_df, output_directory, brand, date_str)
+
+        return unified_df
+
+def export_unified(unified_df, output_directory, brand, date_str):
+    """Guarda el CSV de un día unificado en `output_directory` (Data/Cleaned)"""
+    # Create output directory if it doesn't exist
+    os.makedirs(output_directory, exist_ok=True)
+    
+    output_filename = f'productos_{brand}_unificados_{date_str}.csv'
+    output_filepath = os.path.join(output_directory, output_filename)
+    
+    unified_df.to_csv(output_filepath, index=False)
+    print(f"\nProceso de unificación completado. Resultados guardados en '{output_filepath}'.")
+
+def store_unified(brand_df, brand, storage_mode="snapshots", verbose=True):
+    """Guarda días unificados de una marca y actualiza los agregados. En modo "snapshots" van al
+    histórico Parquet; en modo "deltas", en su lugar, sólo los cambios van a Data/Deltas"""
+    if storage_mode == "deltas":
+        cambios = registrar_dias(brand_df, brand)
+        actualizar_agregados(brand_df, brand, history_base=DELTAS_PATH, leer=leer_deltas)
+        if verbose:
+            print(f"🧩 Cambios registrados: {brand} ({cambios} filas)")
+    else:
+        agregar_dia(brand_df, brand, HISTORY_PATH)
+        actualizar_agregados(brand_df, brand)
 
 # --- Unification Maps ---
 unification_map_not = {
@@ -490,44 +562,147 @@ RAW_DATA_PATH     = os.path.join("Data", "Raw")
 CLEANED_DATA_PATH = os.path.join("Data", "Cleaned")
 USED_DATA_PATH    = os.path.join("Data", "Used")
 
-# Crear directorios si no existen
-os.makedirs(RAW_DATA_PATH,     exist_ok=True)
-os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
-os.makedirs(USED_DATA_PATH,    exist_ok=True)
-
-# Recorrer todos los CSVs en la carpeta Raw
-for filename in os.listdir(RAW_DATA_PATH):
-    if not (filename.endswith(".csv") and filename.startswith("precios_async_")):
-        continue
-
-    input_path = os.path.join(RAW_DATA_PATH, filename)
-
-    # Seleccionar el mapa de unificación según el nombre del archivo
-    if "_not.csv" in filename:
-        unification_map = unification_map_not
-    elif "_felices_las_vacas.csv" in filename:
-        unification_map = unification_map_felices_las_vacas
-    elif "_vegetalex.csv" in filename:
-        unification_map = unification_map_vegetalex
+# CSV completo por día en Data/Cleaned (sólo en modo "snapshots")
+EXPORT_CLEANED_CSV = True
+
+# "deltas": sólo los cambios de precio en Data/Deltas (ver delta_store.py), la fuente del dashboard.
+# "snapshots": cada día va al histórico Parquet (Data/History, congelado desde que se usa "deltas")
+# y, con EXPORT_CLEANED_CSV, a un CSV en Data/Cleaned. El dashboard lee Data/Deltas si existe.
+STORAGE_MODE = "deltas"
+
+# Mapa de unificación según la marca del nombre de archivo (precios_async_AAAA-MM-DD_<marca>.csv)
+UNIFICATION_MAPS = {
+    'not': unification_map_not,
+    'felices_las_vacas': unification_map_felices_las_vacas,
+    'vegetalex': unification_map_vegetalex,
+}
+
+# Matchers de cada proceso del pool, armados una sola vez por worker
+_worker_matchers = {}
+
+
+def _init_worker(matchers):
+    _worker_matchers.update(matchers)
+
+
+def _unify_file(input_path, brand, export_csv, verbose):
+    """Unifica un archivo en un worker; devuelve el DataFrame, las asociaciones nuevas y lo impreso"""
+    matcher = _worker_matchers[brand]
+    known = set(matcher.cache)
+    salida = io.StringIO()
+    error = None
+    unified_df = None
+    with redirect_stdout(salida):
+        try:
+            unified_df = unify_products(
+                input_path,
+                CLEANED_DATA_PATH,
+                PRODUCT_COLUMN,
+                SUPERMARKET_COLUMNS,
+                UNIFICATION_MAPS[brand],
+                export_csv=export_csv,
+                matcher=matcher,
+                verbose=verbose
+            )
+        except Exception as e:
+            error = e
+    new_matches = {raw: name for raw, name in matcher.cache.items() if raw not in known}
+    return unified_df, new_matches, salida.getvalue(), error
+
+
+def raw_files(raw_directory=RAW_DATA_PATH):
+    """[(filename, brand)] de los CSV crudos con mapa conocido, en orden de fecha y marca"""
+    files = []
+    for filename in sorted(os.listdir(raw_directory)):
+        if not (filename.endswith(".csv") and filename.startswith("precios_async_")):
+            continue
+        parsed = parse_raw_filename(filename)
+        if not parsed or parsed[1] not in UNIFICATION_MAPS:
+            print(f"⚠️ No se encontró un 'unification_map' para el archivo: {filename}")
+            continue
+        files.append((filename, parsed[1]))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Unifica los CSV de Data/Raw y los agrega al histórico")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Procesos para unificar archivos en paralelo (default: núcleos disponibles)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Sólo errores y un resumen final (sin vista previa por archivo)")
+    parser.add_argument("--almacenamiento", choices=["snapshots", "deltas"], default=STORAGE_MODE,
+                        help="Cómo guardar cada día: histórico Parquet y CSV completo, o sólo cambios en Data/Deltas")
+    args = parser.parse_args(argv)
+    export_csv = EXPORT_CLEANED_CSV and args.almacenamiento == "snapshots"
+
+    # Crear directorios si no existen
+    os.makedirs(RAW_DATA_PATH,     exist_ok=True)
+    os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
+    os.makedirs(USED_DATA_PATH,    exist_ok=True)
+
+    files = raw_files()
+    if not files:
+        print("No hay archivos nuevos en Data/Raw")
+        return
+
+    # Un matcher (mapa inverso + índice) por marca, armado una vez y copiado a cada worker
+    matchers = {brand: ProductMatcher(brand, UNIFICATION_MAPS[brand])
+                for brand in sorted({brand for _, brand in files})}
+    jobs = [(os.path.join(RAW_DATA_PATH, filename), brand, export_csv, not args.quiet)
+            for filename, brand in files]
+
+    workers = max(1, min(args.workers, len(files)))
+    if workers == 1:
+        _init_worker(matchers)
+        results = (_unify_file(*job) for job in jobs)
+        executor = None
     else:
-        print(f"⚠️ No se encontró un 'unification_map' para el archivo: {filename}")
-        continue
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matchers,))
+        results = executor.map(_unify_file, *zip(*jobs))
 
+    # Los resultados llegan en el orden de `files`: histórico, caché y movimientos son deterministas
+    unified_by_brand = {}
     try:
-        # Ejecutar la función de unificación y guardar en Cleaned
-        unify_products(
-            input_path,
-            CLEANED_DATA_PATH,
-            PRODUCT_COLUMN,
-            SUPERMARKET_COLUMNS,
-            unification_map
-        )
-        print(f"✅ Unificado: {filename}")
-
-        # Mover el CSV procesado a Used
-        dest_path = os.path.join(USED_DATA_PATH, filename)
-        os.rename(input_path, dest_path)
-        print(f"📦 Archivo movido a Used: {dest_path}")
-
-    except Exception as e:
-        print(f"❌ Error procesando {filename}: {e}")
+        for (filename, brand), (unified_df, new_matches, output, error) in zip(files, results):
+            if not args.quiet:
+                print(output, end="")
+            if error is not None:
+                print(f"❌ Error procesando {filename}: {error}")
+                continue
+            matchers[brand].merge(new_matches)
+            unified_by_brand.setdefault(brand, []).append((filename, unified_df))
+            if not args.quiet:
+                print(f"✅ Unificado: {filename}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    unified_count = 0
+    for brand, unified in unified_by_brand.items():
+        try:
+            # Agregar los días al histórico consolidado: una escritura por partición, no por archivo
+            dfs = [unified_df for _, unified_df in unified if unified_df is not None]
+            if dfs:
+                store_unified(pd.concat(dfs, ignore_index=True), brand, args.almacenamiento, verbose=not args.quiet)
+                if not args.quiet:
+                    print(f"📚 Agregado al histórico: {brand} ({len(dfs)} días)")
+        except Exception as e:
+            print(f"❌ Error agregando {brand} al histórico: {e}")
+            continue
+
+        # Mover los CSV procesados a Used
+        for filename, _ in unified:
+            dest_path = os.path.join(USED_DATA_PATH, filename)
+            os.rename(os.path.join(RAW_DATA_PATH, filename), dest_path)
+            unified_count += 1
+            if not args.quiet:
+                print(f"📦 Archivo movido a Used: {dest_path}")
+
+    # Guardar las asociaciones nuevas para no volver a puntuarlas
+    for matcher in matchers.values():
+        matcher.save()
+
+    print(f"✅ {unified_count}/{len(files)} archivos unificados con {workers} proceso(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import asyncio
+import urllib.parse
+
+from metrics import contar, contar_fallo
+
+# Páginas de resultados que se cargan a la vez, cada una en su pestaña
+PESTANIAS = 3
+
+# Mayor número de página que muestra el paginador (en el atributo value o en el texto); 0 si no hay
+JS_TOTAL_PAGINAS = """
+(selector) => {
+    let total = 0;
+    for (const el of document.querySelectorAll(selector)) {
+        for (const texto of [el.getAttribute("value"), el.innerText]) {
+            const numero = parseInt((texto || "").trim(), 10);
+            if (Number.isInteger(numero) && String(numero) === (texto || "").trim() && numero > total) {
+                total = numero;
+            }
+        }
+    }
+    return total;
+}
+"""
+
+
+def con_pagina(url, numero, parametro="page"):
+    """La misma URL con el parámetro de página en `numero` (agregado o reemplazado)"""
+    partes = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(partes.query, keep_blank_values=True) if k != parametro]
+    query.append((parametro, str(numero)))
+    return urllib.parse.urlunsplit(partes._replace(query=urllib.parse.urlencode(query)))
+
+
+async def total_paginas(page, selector):
+    return await page.evaluate(JS_TOTAL_PAGINAS, selector) or 1
+
+
+async def leer_paginas(context, numeros, leer, pestanias=PESTANIAS, reintentos=1, al_leer=None):
+    """Lee cada página con `leer(page, numero)` en una pestaña propia, de a `pestanias` a la vez.
+
+    Una página que falla se reintenta sola, hasta `reintentos` veces. Devuelve {numero: resultado},
+    con None para las páginas que no se pudieron leer. Con `al_leer`, se llama a
+    `al_leer(numero, resultado)` en el orden de `numeros` apenas esa página y todas las anteriores
+    terminaron, así quien llama guarda lo leído aunque después se agote el tiempo.
+    """
+    numeros = list(numeros)
+    semaforo = asyncio.Semaphore(max(pestanias, 1))
+    leidas = {}
+    entregadas = 0
+
+    async def leer_una(numero):
+        for intento in range(reintentos + 1):
+            async with semaforo:
+                page = await context.new_page()
+                try:
+                    return await leer(page, numero)
+                except Exception as e:
+                    contar_fallo(e, fase="pagina")
+                    if intento < reintentos:
+                        contar("reintentos", motivo="pagina")
+                finally:
+                    if not page.is_closed():
+                        await asyncio.shield(page.close())
+        return None
+
+    async def leer_y_entregar(numero):
+        nonlocal entregadas
+        leidas[numero] = await leer_una(numero)
+        while al_leer is not None and entregadas < len(numeros) and numeros[entregadas] in leidas:
+            al_leer(numeros[entregadas], leidas[numeros[entregadas]])
+            entregadas += 1
+
+    await asyncio.gather(*(leer_y_entregar(n) for n in numeros))
+    return {n: leidas[n] for n in numeros}
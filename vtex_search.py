@@ -0,0 +1,228 @@
+import asyncio
+import json
+import math
+import sys
+import urllib.parse
+import urllib.request
+
+from browser_pool import USER_AGENT, abrir_contexto
+from metrics import contar, contar_fallo, span
+from url_pagination import PESTANIAS, con_pagina, leer_paginas
+
+# Supermercados montados sobre VTEX y la raíz de su storefront
+TIENDAS_VTEX = {
+    "carrefour": "https://www.carrefour.com.ar",
+    "dia": "https://diaonline.supermercadosdia.com.ar",
+    "disco": "https://www.disco.com.ar",
+    "vea": "https://www.vea.com.ar",
+}
+
+SEARCH_PATH = "/api/catalog_system/pub/products/search"
+TAMANIO_PAGINA = 50   # VTEX admite como máximo 50 productos por pedido (_from.._to)
+MAX_RESULTADOS = 2500  # VTEX no pagina más allá de _from=2500
+TIMEOUT_HTTP = 20
+
+# Pedidos de búsqueda que hace el storefront al cargar la grilla: GraphQL de VTEX IO,
+# Intelligent Search y la API REST del catálogo
+PATRONES_BUSQUEDA = ("operationName=productSearchV3", "/_v/api/intelligent-search/product_search", SEARCH_PATH)
+TIMEOUT_CAPTURA = 20
+OPCIONES_CONTEXTO = {"dia": {"user_agent": USER_AGENT}}
+
+
+def formatear_precio(valor):
+    """Convierte 1234.5 en "$1.234,50", el mismo formato que se lee del DOM"""
+    if valor is None or valor <= 0:
+        return "Sin precio"
+    entero, decimales = f"{valor:,.2f}".split(".")
+    return f"${entero.replace(',', '.')},{decimales}"
+
+
+def oferta_vtex(producto):
+    """Devuelve (primer SKU, commertialOffer de su vendedor por defecto)"""
+    for item in producto.get("items") or []:
+        sellers = item.get("sellers") or []
+        for seller in sellers:
+            if seller.get("sellerDefault"):
+                return item, seller.get("commertialOffer") or {}
+        if sellers:
+            return item, sellers[0].get("commertialOffer") or {}
+    return None, {}
+
+
+def producto_vtex(producto):
+    """{"nombre", "precio", "sku", "precio_lista", "precio_venta"} de un producto de VTEX.
+
+    "precio" tiene el mismo formato que se lee del DOM; "precio_lista" y "precio_venta" son los
+    numéricos exactos (el pipeline en streaming usa "precio_venta" sin volver a parsear el texto).
+    """
+    item, oferta = oferta_vtex(producto)
+    return {
+        "nombre": (producto.get("productName") or "").strip(),
+        "precio": formatear_precio(oferta.get("Price")),
+        "sku": (item or {}).get("itemId"),
+        "precio_lista": oferta.get("ListPrice"),
+        "precio_venta": oferta.get("Price"),
+    }
+
+
+def agregar_productos(productos, vistos, tienda, marca, pagina):
+    """Agrega a `productos` los de la marca de una página de resultados, sin repetir nombres"""
+    for producto in pagina:
+        fila = producto_vtex(producto)
+        if not fila["nombre"] or fila["nombre"] in vistos or not incluir_producto(tienda, marca, fila["nombre"]):
+            continue
+        vistos.add(fila["nombre"])
+        productos.append(fila)
+
+
+def incluir_producto(tienda, marca, nombre):
+    """Replica el filtro de marca que aplica cada scraper de Playwright"""
+    nombre = nombre.lower()
+    marca = marca.lower()
+    if tienda == "carrefour":
+        return marca in nombre or (marca == "felices las vacas" and "jogurtti" in nombre)
+    if tienda == "dia":
+        return marca != "felices las vacas" or "felices las vacas" in nombre
+    return marca in nombre
+
+
+def _get_json(url):
+    pedido = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
+    with urllib.request.urlopen(pedido, timeout=TIMEOUT_HTTP) as respuesta:
+        # Header "resources: 0-49/137" con el total de resultados
+        total = None
+        resources = respuesta.headers.get("resources")
+        if resources and "/" in resources:
+            total = int(resources.rsplit("/", 1)[1])
+        cuerpo = respuesta.read()
+        contar("bytes_recibidos", len(cuerpo))
+        return json.loads(cuerpo.decode("utf-8")), total
+
+
+async def _pagina_vtex(base_url, marca, desde):
+    query = urllib.parse.urlencode({"ft": marca, "_from": desde, "_to": desde + TAMANIO_PAGINA - 1})
+    with span("api", desde=desde):
+        return await asyncio.to_thread(_get_json, f"{base_url}{SEARCH_PATH}?{query}")
+
+
+async def buscar_vtex(tienda, marca, base_url=None, resultados=None):
+    """Pagina la búsqueda de catálogo VTEX y devuelve [{"nombre", "precio"}] sin abrir un navegador"""
+    base_url = (base_url or TIENDAS_VTEX[tienda]).rstrip("/")
+
+    primera, total = await _pagina_vtex(base_url, marca, 0)
+    paginas = [primera]
+    if total is not None:
+        # Con el total conocido, el resto de las páginas se piden en paralelo
+        desdes = range(TAMANIO_PAGINA, min(total, MAX_RESULTADOS), TAMANIO_PAGINA)
+        resto = await asyncio.gather(*(_pagina_vtex(base_url, marca, d) for d in desdes))
+        paginas.extend(p for p, _ in resto)
+    else:
+        desde = TAMANIO_PAGINA
+        while len(paginas[-1]) == TAMANIO_PAGINA and desde < MAX_RESULTADOS:
+            pagina, _ = await _pagina_vtex(base_url, marca, desde)
+            paginas.append(pagina)
+            desde += TAMANIO_PAGINA
+
+    productos = [] if resultados is None else resultados
+    vistos = set()
+    for pagina in paginas:
+        agregar_productos(productos, vistos, tienda, marca, pagina)
+    return productos
+
+
+def productos_en_respuesta(datos):
+    """(productos, total de resultados o None) de una respuesta de búsqueda del storefront"""
+    if isinstance(datos, list):
+        return datos, None  # API REST del catálogo
+    if "data" in datos:
+        busqueda = (datos.get("data") or {}).get("productSearch") or {}
+        return busqueda.get("products") or [], busqueda.get("recordsFiltered")
+    return datos.get("products") or [], datos.get("recordsFiltered")  # Intelligent Search
+
+
+async def capturar_pagina(page, url, numero):
+    """Navega a `url` y devuelve (productos, total) de la primera respuesta de búsqueda con productos"""
+    capturada = asyncio.get_running_loop().create_future()
+
+    async def al_responder(response):
+        if capturada.done() or not any(patron in response.url for patron in PATRONES_BUSQUEDA):
+            return
+        try:
+            datos = await response.json()
+        except Exception:
+            return
+        productos, total = productos_en_respuesta(datos)
+        if productos and not capturada.done():
+            capturada.set_result((productos, total))
+
+    page.on("response", al_responder)
+    with span("goto", pagina=numero):
+        await page.goto(url, wait_until="domcontentloaded")
+    with span("captura", pagina=numero):
+        return await asyncio.wait_for(capturada, TIMEOUT_CAPTURA)
+
+
+async def capturar_vtex(tienda, marca, pool=None, resultados=None, pestanias=PESTANIAS):
+    """Abre la búsqueda del storefront y lee los productos del JSON que pide la propia página.
+
+    No hace falta esperar el render ni scrollear: con el total de la primera respuesta se abren
+    las páginas siguientes (`&page=N`) de a `pestanias` a la vez y se captura su búsqueda.
+    """
+    termino = urllib.parse.quote(marca.lower())
+    url = f"{TIENDAS_VTEX[tienda]}/{termino}?_q={urllib.parse.quote(marca)}&map=ft"
+    productos = [] if resultados is None else resultados
+    vistos = set()
+
+    async with abrir_contexto(pool, tienda, **OPCIONES_CONTEXTO.get(tienda, {})) as context:
+        page = await context.new_page()
+        try:
+            primera, total = await capturar_pagina(page, url, 1)
+        finally:
+            if not page.is_closed():
+                await asyncio.shield(page.close())
+        agregar_productos(productos, vistos, tienda, marca, primera)
+
+        por_pagina = len(primera)
+        if total and total > por_pagina:
+            paginas = min(math.ceil(total / por_pagina), MAX_RESULTADOS // por_pagina)
+
+            # Cada página se agrega en orden apenas están todas las anteriores
+            def agregar(numero, leida):
+                if leida is not None:
+                    agregar_productos(productos, vistos, tienda, marca, leida[0])
+
+            await leer_paginas(
+                context, range(2, paginas + 1), lambda p, n: capturar_pagina(p, con_pagina(url, n), n), pestanias,
+                al_leer=agregar)
+    return productos
+
+
+async def buscar_vtex_con_fallback(tienda, marca, scraper_playwright, base_url=None, resultados=None, buscar=None):
+    """Intenta la búsqueda de VTEX y, si falla o no trae nada, usa el scraper de Playwright.
+
+    `buscar` recibe la lista donde acumular los productos; por defecto es la API del catálogo
+    (`buscar_vtex`). `scraper_playwright` recibe la misma lista (`resultados`).
+    """
+    resultados = [] if resultados is None else resultados
+    if buscar is None:
+        buscar = lambda r: buscar_vtex(tienda, marca, base_url=base_url, resultados=r)
+    try:
+        productos = await buscar(resultados)
+        if productos:
+            return productos
+        print(f"⚠️ {tienda}: la búsqueda VTEX no devolvió productos, se usa Playwright")
+    except Exception as e:
+        contar_fallo(e, fase="api")
+        print(f"⚠️ {tienda}: error en la búsqueda VTEX ({repr(e)}), se usa Playwright")
+    contar("reintentos", motivo="fallback_playwright")
+    resultados.clear()
+    return await scraper_playwright(resultados)
+
+
+if __name__ == "__main__":
+    tienda = sys.argv[1] if len(sys.argv) > 1 else "disco"
+    marca = " ".join(sys.argv[2:]) or "Not"
+    resultados = asyncio.run(buscar_vtex(tienda, marca))
+    print(f"Se encontraron {len(resultados)} productos para la marca '{marca}' en {tienda}:\n")
+    for i, prod in enumerate(resultados, 1):
+        print(f"{i}. {prod['nombre']} - Precio: {prod['precio']}")